@@ -1,2 +1,3 @@
 cd %~dp0
+py -3.10 %~dp0/../scripts/compile_scenes.py
 py -3.10 %~dp0/setup.py build
\ No newline at end of file
@@ -1,28 +1,89 @@
 
 import sys
-# import pickle
-import pygame
-
-from drunkparanoia.io import load_skins, load_main_resources
-from drunkparanoia.render import render_game
-from drunkparanoia.scene import GameLoop
-
-pygame.init()
-screen = pygame.display.set_mode((640, 360), pygame.SCALED | pygame.FULLSCREEN)
-# screen = pygame.display.set_mode((640, 360), pygame.SCALED)
-# screen = pygame.display.set_mode((640, 360))
-pygame.joystick.init()
-load_skins()
-load_main_resources()
-
-scene = 'resources/scenes/saloon.json'
-loop = GameLoop()
-loop.set_scene(scene)
-loop.start_scene()
-replay = []
-while not loop.done:
-    next(loop)
-    # replay.append(pickle.dumps(scene))
-    render_game(screen, loop)
-    pygame.display.update()
-sys.exit(0)
\ No newline at end of file
+import json
+import time
+import multiprocessing
+
+START = time.perf_counter()
+
+
+def main():
+    from drunkparanoia import profiler  # noqa
+    from drunkparanoia.config import PROFILING, REPLAY, SKINS  # noqa
+
+    if PROFILING.TRACE_FILE or PROFILING.STARTUP_REPORT:
+        profiler.enable()
+    if PROFILING.STARTUP_REPORT:
+        profiler.trace_imports()
+
+    with profiler.scope('startup.imports'):
+        import pygame  # noqa
+        from drunkparanoia.io import load_main_resources  # noqa
+        from drunkparanoia.render import render_game, render_loading  # noqa
+        from drunkparanoia.scene import GameLoop  # noqa
+        from drunkparanoia.replay import Recorder  # noqa
+
+    with profiler.scope('startup.display'):
+        pygame.init()
+        flags = pygame.SCALED | pygame.FULLSCREEN
+        screen = pygame.display.set_mode((640, 360), flags)
+        # screen = pygame.display.set_mode((640, 360), pygame.SCALED)
+        # screen = pygame.display.set_mode((640, 360))
+        pygame.joystick.init()
+
+    with profiler.scope('startup.main_resources'):
+        load_main_resources()
+
+    if SKINS.LOADER_WORKERS:
+        from drunkparanoia.decode import load_skins
+
+        def show_progress(done, total):
+            pygame.event.pump()
+            render_loading(screen, done, total)
+            pygame.display.update()
+
+        with profiler.scope('startup.skins'):
+            show_progress(0, 1)
+            load_skins(SKINS.LOADER_WORKERS, show_progress)
+
+    with profiler.scope('startup.start_scene'):
+        scene = 'resources/scenes/saloon.json'
+        loop = GameLoop()
+        # The recorder seeds the random generator before the round is built.
+        recorder = Recorder(loop) if REPLAY.RECORD_FILE else None
+        loop.set_scene(scene)
+        loop.start_scene()
+    # The skins are built on first use, the preloader warms them meanwhile.
+    loop.preload()
+
+    frame = 0
+    while not loop.done:
+        with profiler.scope('startup.first_frame' if not frame else 'frame'):
+            next(recorder or loop)
+            with profiler.scope('render_game'):
+                render_game(screen, loop)
+            pygame.display.update()
+        frame += 1
+        if frame == 1:
+            time_to_first_frame = time.perf_counter() - START
+        if frame == PROFILING.MAX_FRAMES:
+            break
+
+    if recorder:
+        recorder.save(REPLAY.RECORD_FILE)
+    if PROFILING.STARTUP_REPORT and frame:
+        report = profiler.startup_report(time_to_first_frame)
+        with open(PROFILING.STARTUP_REPORT, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(profiler.format_startup_report(report))
+    if PROFILING.TRACE_FILE:
+        profiler.dump_chrome_trace(PROFILING.TRACE_FILE)
+        print(profiler.format_summary())
+    return 0
+
+
+if __name__ == '__main__':
+    # The frozen build starts the skin loader workers with this executable,
+    # freeze_support runs their job instead of the game.
+    multiprocessing.freeze_support()
+    sys.exit(main())
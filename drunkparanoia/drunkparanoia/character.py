@@ -3,7 +3,11 @@ from drunkparanoia.config import (
     DIRECTIONS, SPEED, COUNTDOWNS, HAT_TO_DIRECTION, HOLDABLE_ANIMATIONS)
 from drunkparanoia.joystick import get_pressed_direction, get_current_commands
 from drunkparanoia.config import LOOPING_ANIMATIONS, CHARACTER_STATUSES
-from drunkparanoia.coordinates import Coordinates, get_box, distance
+from drunkparanoia.coordinates import get_box, distance
+from drunkparanoia.profiler import profiled
+from drunkparanoia.scheduler import Countdown
+from drunkparanoia.table import (
+    TableCoordinates, STATUSES, STATUS_IDS, DIRECTION_VALUES, DIRECTION_IDS)
 
 
 class Player:
@@ -27,6 +31,10 @@ class Player:
     def dead(self):
         return self.character.status == CHARACTER_STATUSES.OUT
 
+    @property
+    def inert(self):
+        return self.dead
+
     def kill(self, target, black_screen=False):
         self.character.kill(target, black_screen)
         player = self.scene.find_player(target)
@@ -37,6 +45,7 @@ class Player:
             self.npc_killed += 1
         self.bullet_cooldown = COUNTDOWNS.BULLET_COOLDOWN
 
+    @profiled('Player.__next__')
     def __next__(self):
         # self.life -= 1
         if self.character.status == CHARACTER_STATUSES.OUT:
@@ -118,30 +127,86 @@ class Npc:
     def __init__(self, character, scene):
         self.character = character
         self.scene = scene
-        self.next_duel_check_countdown = random.randrange(
-            COUNTDOWNS.DUEL_CHECK_MIN, COUNTDOWNS.DUEL_CHECK_MAX)
-        self.coma_count_down = random.randrange(
+        self.duel_check_due = False
+        self.duel_check_countdown = character.countdown(
+            self.set_duel_check_due, CHARACTER_STATUSES.WALKING)
+        self.duel_check_countdown.start(random.randrange(
+            COUNTDOWNS.DUEL_CHECK_MIN, COUNTDOWNS.DUEL_CHECK_MAX))
+        coma_count_down = random.randrange(
             COUNTDOWNS.COMA_MIN, COUNTDOWNS.COMA_MAX)
-        self.interaction_cooldown = random.randrange(
+        self.interaction_due = False
+        self.interaction_countdown = character.countdown(
+            self.set_interaction_due, [CHARACTER_STATUSES.FREE])
+        self.interaction_countdown.start(random.randrange(
             COUNTDOWNS.INTERACTION_COOLDOWN_MIN,
-            COUNTDOWNS.INTERACTION_COOLDOWN_MAX)
-        self.cool_down = 0
+            COUNTDOWNS.INTERACTION_COOLDOWN_MAX))
+        self.cool_down_due = True
+        self.cool_down_countdown = character.countdown(
+            self.set_cool_down_due, [CHARACTER_STATUSES.FREE])
         self.release_time = 0
+        self.release_timer = None
+        self.release_due = False
         self.is_cooling_down = False
+        self.comatose = False
+        # The npc is ticked for the first time on the next scene tick.
+        scene.timers.schedule(coma_count_down + 1, self.set_comatose)
+
+    def set_comatose(self):
+        self.comatose = True
+        self.scene.wake(self.character)
+
+    def set_release_due(self):
+        self.release_due = True
+        self.scene.wake(self.character)
+
+    def set_duel_check_due(self):
+        self.duel_check_due = True
+
+    def set_interaction_due(self):
+        self.interaction_due = True
+
+    def set_cool_down_due(self):
+        self.cool_down_due = True
+
+    @property
+    def inert(self):
+        """
+        Ticking the npc would change nothing until a timer expires or another
+        character changes its status: it holds its last frame out of the
+        game, or waits for the end of a duel.
+        """
+        character = self.character
+        status = character.status
+        if status == CHARACTER_STATUSES.OUT:
+            return character.held
+        if status == CHARACTER_STATUSES.DUEL_ORIGIN:
+            return (
+                not self.comatose and not self.release_due and
+                self.release_timer is not None and
+                character.spritesheet.animation_is_done)
+        if status == CHARACTER_STATUSES.DUEL_TARGET:
+            return (
+                not self.comatose and not character.vomit_due and
+                character.spritesheet.animation_is_done)
+        return False
 
     def test_duels(self):
-        if self.next_duel_check_countdown > 0:
-            self.next_duel_check_countdown -= 1
+        if not self.duel_check_due:
             return False
         origin = [c for c, _ in self.character.scene.possible_duels]
         if self.character not in origin:
             return False
         self.character.request_duel()
-        self.next_duel_check_countdown = random.randrange(
-            COUNTDOWNS.DUEL_CHECK_MIN, COUNTDOWNS.DUEL_CHECK_MAX)
+        self.duel_check_due = False
+        self.duel_check_countdown.start(random.randrange(
+            COUNTDOWNS.DUEL_CHECK_MIN, COUNTDOWNS.DUEL_CHECK_MAX))
         self.release_time = random.randrange(
             COUNTDOWNS.DUEL_RELEASE_TIME_MIN,
             COUNTDOWNS.DUEL_RELEASE_TIME_MAX)
+        if self.release_timer:
+            self.release_timer.cancel()
+        self.release_timer = None
+        self.release_due = False
         return True
 
     def fall_to_coma(self):
@@ -162,7 +227,7 @@ class Npc:
     def interaction_zone(self):
         condition = (
             (zone := self.character.attraction_zone()) and
-            self.interaction_cooldown == 0 and
+            self.interaction_due and
             random.choice(range(COUNTDOWNS.INTERACTION_PROBABILITY)) == 0)
         if condition:
             return zone
@@ -170,8 +235,6 @@ class Npc:
     def evaluate_free(self):
         if self.test_duels():
             return
-        if self.interaction_cooldown > 0:
-            self.interaction_cooldown -=1
 
         if self.is_cooling_down is False:
             proba = COUNTDOWNS.COOLDOWN_PROBABILITY
@@ -180,42 +243,40 @@ class Npc:
                 self.character.path = None
                 self.character.ghost = None
                 self.is_cooling_down = True
-                self.cool_down = random.randrange(
-                    COUNTDOWNS.COOLDOWN_MIN, COUNTDOWNS.COOLDOWN_MAX)
+                self.cool_down_due = False
+                self.cool_down_countdown.start(random.randrange(
+                    COUNTDOWNS.COOLDOWN_MIN, COUNTDOWNS.COOLDOWN_MAX))
                 next(self.character)
                 return
 
         if zone := self.interaction_zone():
             self.character.go_to(zone.target, zone.action, zone.direction)
-            self.interaction_cooldown = random.randrange(
+            self.interaction_due = False
+            self.interaction_countdown.start(random.randrange(
                 COUNTDOWNS.INTERACTION_COOLDOWN_MIN,
-                COUNTDOWNS.INTERACTION_COOLDOWN_MAX)
+                COUNTDOWNS.INTERACTION_COOLDOWN_MAX))
             next(self.character)
             return
 
-        if self.cool_down == 0:
+        if self.cool_down_due:
             self.character.end_autopilot()
             self.is_cooling_down = False
             self.character.status = CHARACTER_STATUSES.AUTOPILOT
-            functions = [shortest_path] * 2 + [equilateral_path]
-            func = random.choice(functions)
             self.character.ghost = None
             destination = self.character.choice_destination()
-            position = self.character.coordinates.position
-            self.character.path = func(position, destination)
+            self.character.path = self.character.find_path(destination)
             self.character.autopilot()
             next(self.character)
             return
 
         if self.character.speed:
             self.character.decelerate()
-        self.cool_down -= 1
         next(self.character)
 
+    @profiled('Npc.__next__')
     def __next__(self):
-        if self.coma_count_down == 0:
+        if self.comatose:
             return self.fall_to_coma()
-        self.coma_count_down -= 1
 
         if self.character.status == CHARACTER_STATUSES.AUTOPILOT:
             if self.test_duels():
@@ -230,11 +291,15 @@ class Npc:
             if not self.character.spritesheet.animation_is_done:
                 next(self.character)
                 return
-            if self.release_time == 0:
+            if self.release_due:
+                self.release_due = False
+                self.release_timer = None
                 self.character.release_duel()
                 next(self.character)
                 return
-            self.release_time -= 1
+            if self.release_timer is None:
+                self.release_timer = self.scene.timers.schedule(
+                    self.release_time, self.set_release_due)
             return
 
         next(self.character)
@@ -242,14 +307,20 @@ class Npc:
 
 class Character:
     def __init__(self, position, spritesheet, variation, scene):
+        self.scene = scene
+        self.row = scene.table.append(self)
         self.spritesheet = spritesheet
-        self.coordinates = Coordinates(position)
+        self.spritesheet.bind(scene.table, self.row)
+        self.coordinates = TableCoordinates(scene.table, self.row, position)
         self.direction = DIRECTIONS.DOWN
         self.variation = variation
         self.speed = 0
-        self.scene = scene
-        self.vomit_count_down = random.randrange(
-            COUNTDOWNS.VOMIT_MIN, COUNTDOWNS.VOMIT_MAX)
+        self.countdowns = []
+        self.vomit_due = False
+        self.vomit_countdown = self.countdown(
+            self.set_vomit_due, CHARACTER_STATUSES.WALKING)
+        self.vomit_countdown.start(random.randrange(
+            COUNTDOWNS.VOMIT_MIN, COUNTDOWNS.VOMIT_MAX))
         self.status = CHARACTER_STATUSES.FREE
         self.duel_target = None
         self.ghost = None
@@ -257,25 +328,60 @@ class Character:
         self.buffer_animation = None
         self.buffer_direction = None
 
+    @property
+    def speed(self):
+        return self.scene.table.speed.item(self.row)
+
+    @speed.setter
+    def speed(self, value):
+        self.scene.table.speed[self.row] = value
+
+    @property
+    def direction(self):
+        return DIRECTION_VALUES[self.scene.table.direction.item(self.row)]
+
+    @direction.setter
+    def direction(self, value):
+        self.scene.table.direction[self.row] = DIRECTION_IDS[value]
+
+    @property
+    def status(self):
+        return STATUSES[self.scene.table.status.item(self.row)]
+
+    @status.setter
+    def status(self, value):
+        self.scene.table.status[self.row] = STATUS_IDS[value]
+        for countdown in self.countdowns:
+            countdown.follow(value)
+        self.scene.wake(self)
+
+    def countdown(self, callback, statuses):
+        """
+        Countdown running while the character has one of the statuses.
+        """
+        countdown = Countdown(self.scene.timers, callback, statuses)
+        self.countdowns.append(countdown)
+        countdown.follow(self.status)
+        return countdown
+
+    def set_vomit_due(self):
+        self.vomit_due = True
+
+    @property
+    def held(self):
+        """
+        Out of the game and holding the last frame of its animation.
+        """
+        return (
+            self.status == CHARACTER_STATUSES.OUT and
+            not self.vomit_due and
+            self.buffer_animation is None and
+            self.spritesheet.animation_is_done and
+            self.spritesheet.animation in HOLDABLE_ANIMATIONS)
+
     def choice_destination(self):
-        limit = 0
-        while True:
-            dst = self.scene.choice_destination_from(self.coordinates.position)
-            if dst is None:
-                break
-            if not self.scene.collide(get_box(dst, self.box)):
-                return dst
-            limit += 1
-        x, y = [int(n) for n in self.coordinates.position]
-        x = random.randrange(x - 75, x + 75)
-        y = random.randrange(y - 75, y + 75)
-        pos = x, y
-        while self.scene.collide(get_box(pos, self.box)):
-            x, y = [int(n) for n in self.coordinates.position]
-            x = random.randrange(x - 75, x + 75)
-            y = random.randrange(y - 75, y + 75)
-            pos = x, y
-        return pos
+        sampler = self.scene.destination_sampler(self.box)
+        return sampler.choice(self.coordinates.position)
 
     @property
     def box(self):
@@ -325,18 +431,18 @@ class Character:
         self.stop()
         self.spritesheet.animation = 'vomit'
         self.spritesheet.index = 0
-        self.vomit_count_down = random.randrange(
-            COUNTDOWNS.VOMIT_MIN, COUNTDOWNS.VOMIT_MAX)
+        self.vomit_due = False
+        self.vomit_countdown.start(random.randrange(
+            COUNTDOWNS.VOMIT_MIN, COUNTDOWNS.VOMIT_MAX))
         self.status = CHARACTER_STATUSES.STUCK
 
     def __next__(self):
-        if self.vomit_count_down <= 0:
+        if self.vomit_due:
             self.vomit()
             return
 
         match self.status:
             case CHARACTER_STATUSES.AUTOPILOT:
-                self.vomit_count_down -= 1
                 return self.autopilot()
 
             case CHARACTER_STATUSES.OUT:
@@ -395,8 +501,6 @@ class Character:
                 next(self.spritesheet)
                 return
 
-        self.vomit_count_down -= 1
-
         if self.speed:
             self.offset()
 
@@ -492,26 +596,31 @@ class Character:
             return
 
     def request_interaction(self):
-        for zone in self.scene.interaction_zones:
-            if zone.contains(self.coordinates.position):
-                self.go_to(zone.target, zone.action, zone.direction)
-                return True
-        return False
+        zone = self.scene.interaction_zone_at(self.coordinates.position)
+        if zone is None:
+            return False
+        self.go_to(zone.target, zone.action, zone.direction)
+        return True
 
     def attraction_zone(self):
-        return next((
-            zone for zone in self.scene.interaction_zones if
-            zone.attract(self.coordinates.position)), None)
+        return self.scene.attraction_zone_at(self.coordinates.position)
 
     def go_to(self, position, action=None, direction=None):
         self.status = CHARACTER_STATUSES.AUTOPILOT
         self.ghost = None
-        self.path = shortest_path(
-            self.coordinates.position, position.copy())
+        self.path = self.find_path(position)
 
         self.buffer_animation = action
         self.buffer_direction = direction
 
+    def find_path(self, destination):
+        origin = self.coordinates.position
+        destination = [
+            o if d is None else d for o, d in zip(origin, destination)]
+        grid = self.scene.navigation_grid(self.box)
+        path = grid.find_path(origin, destination)
+        return path or shortest_path(origin, destination)
+
     def end_autopilot(self):
         self.stop()
         self.ghost = None
@@ -569,18 +678,6 @@ def points_to_direction(p1, p2):
     return HAT_TO_DIRECTION.get((x, y))
 
 
-def equilateral_path(origin, dst):
-    dst = list(dst)[:]
-    dst[0] = dst[0] if dst[0] is not None else origin[0]
-    dst[1] = dst[1] if dst[1] is not None else origin[1]
-    if origin[0] in dst or origin[1] in dst:
-        return [dst]
-    intermediate = random.choice((
-        [origin[0], dst[1]],
-        [dst[0], origin[1]]))
-    return [intermediate, dst]
-
-
 def shortest_path(orig, dst):
     """
     Create a path between an origin and a destination lock to height
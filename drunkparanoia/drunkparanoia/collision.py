@@ -0,0 +1,249 @@
+"""
+Baked static collision geometry. The walls, no go zones and prop boxes never
+move during a round, they are rasterized once into bitmaps with summed area
+tables so a box test costs a few array lookups.
+
+Pixels are the integer lattice points. A rectangle with integer coordinates
+is rasterized exactly: a box of at least 1px wide and high hits it if and
+only if it contains one of its points. Polygons (and rectangles with
+floating coordinates) are rasterized with a band around their outline into
+an uncertain bitmap: a box containing none of those points can't hit them,
+otherwise the exact geometry decides.
+"""
+import math
+import numpy
+from drunkparanoia.coordinates import box_hit_box, box_hit_polygon
+
+
+# Distance to a polygon outline under which a point is uncertain. It must be
+# greater than sqrt(2): the distance from a point of a box to the closest
+# lattice point of this box.
+BAND_WIDTH = 1.5
+
+
+class CollisionMap:
+    def __init__(self, rects, polygons, bounds=(0, 0, 640, 360), baked=None):
+        self.rects = [list(r) for r in rects if is_integer_rect(r)]
+        self.float_rects = [list(r) for r in rects if not is_integer_rect(r)]
+        self.polygons = [[list(p) for p in polygon] for polygon in polygons]
+
+        outlines = self.polygons + [
+            rect_to_polygon(r) for r in self.float_rects]
+        left, top, right, bottom = extent(self.rects, outlines, bounds)
+        self.left, self.top = left, top
+        self.width = right - left + 1
+        self.height = bottom - top + 1
+        if baked is not None:
+            # Arrays restored from a compiled scene.
+            self.occupied = baked['occupied']
+            self.uncertain = baked['uncertain']
+            self.occupied_table = baked['occupied_table']
+            self.uncertain_table = baked['uncertain_table']
+            self.inner_table = baked['inner_table']
+            return
+
+        shape = self.height, self.width
+        occupied = numpy.zeros(shape, dtype=bool)
+        uncertain = numpy.zeros(shape, dtype=bool)
+        inner = numpy.zeros(shape, dtype=bool)
+        for x, y, width, height in self.rects:
+            occupied[
+                y - top: y + height - top + 1,
+                x - left: x + width - left + 1] = True
+        for outline in outlines:
+            self.rasterize_outline(outline, uncertain, inner)
+        uncertain &= ~occupied
+        self.occupied = occupied
+        self.uncertain = uncertain
+        self.occupied_table = summed_area_table(occupied)
+        self.uncertain_table = summed_area_table(uncertain)
+        self.inner_table = summed_area_table(inner)
+
+    def baked_arrays(self):
+        return {
+            'occupied': self.occupied,
+            'uncertain': self.uncertain,
+            'occupied_table': self.occupied_table,
+            'uncertain_table': self.uncertain_table,
+            'inner_table': self.inner_table}
+
+    def rasterize_outline(self, polygon, uncertain, inner):
+        """
+        Set the points inside the polygon or close to its outline as
+        uncertain, and the points inside which are far enough from the outline
+        as inner. A box whose lattice points are all inner has its corners
+        inside the polygon, the exact test is then always true.
+        """
+        xs = [p[0] for p in polygon]
+        ys = [p[1] for p in polygon]
+        margin = math.ceil(BAND_WIDTH)
+        left = max(math.floor(min(xs)) - margin, self.left)
+        right = min(math.ceil(max(xs)) + margin, self.left + self.width - 1)
+        top = max(math.floor(min(ys)) - margin, self.top)
+        bottom = min(math.ceil(max(ys)) + margin, self.top + self.height - 1)
+        if left > right or top > bottom:
+            return
+        grid_x, grid_y = numpy.meshgrid(
+            numpy.arange(left, right + 1), numpy.arange(top, bottom + 1))
+        points = numpy.column_stack((grid_x.ravel(), grid_y.ravel()))
+        # matplotlib is slow to import, compiled scenes don't need it here.
+        from matplotlib.path import Path
+        inside = Path(polygon).contains_points(points)
+        near = outline_distance(points, polygon) <= BAND_WIDTH
+        region = (
+            slice(top - self.top, bottom - self.top + 1),
+            slice(left - self.left, right - self.left + 1))
+        uncertain[region] |= (inside | near).reshape(grid_x.shape)
+        inner[region] |= (inside & ~near).reshape(grid_x.shape)
+
+    def lattice_range(self, box):
+        """
+        Indexes of the lattice points contained in the box, clipped to the
+        map. Returns None if the box doesn't cover any point of the map.
+        """
+        x0 = max(math.ceil(box[0]) - self.left, 0)
+        x1 = min(math.floor(box[0] + box[2]) - self.left, self.width - 1)
+        y0 = max(math.ceil(box[1]) - self.top, 0)
+        y1 = min(math.floor(box[1] + box[3]) - self.top, self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return
+        return x0, y0, x1 + 1, y1 + 1
+
+    def collide(self, box):
+        if box[2] < 1 or box[3] < 1:
+            # Such a box may not contain any lattice point.
+            return self.collide_exact(box)
+        indexes = self.lattice_range(box)
+        if indexes is None:
+            return False
+        x0, y0, x1, y1 = indexes
+        table = self.occupied_table
+        occupied = (
+            table.item(y1, x1) - table.item(y0, x1) -
+            table.item(y1, x0) + table.item(y0, x0))
+        if occupied:
+            return True
+        table = self.uncertain_table
+        uncertain = (
+            table.item(y1, x1) - table.item(y0, x1) -
+            table.item(y1, x0) + table.item(y0, x0))
+        if not uncertain:
+            return False
+        table = self.inner_table
+        inner = (
+            table.item(y1, x1) - table.item(y0, x1) -
+            table.item(y1, x0) + table.item(y0, x0))
+        if inner == (x1 - x0) * (y1 - y0):
+            return True
+        return self.collide_exact(box)
+
+    def collide_exact(self, box):
+        return (
+            any(box_hit_box(box, rect) for rect in self.rects) or
+            any(box_hit_box(box, rect) for rect in self.float_rects) or
+            any(box_hit_polygon(box, p) for p in self.polygons))
+
+    def collision_mask(self, rect, box, exact=True):
+        """
+        Vectorized collide for every integer position of the rect. Returns a
+        boolean array [row, column]. Unless exact, the positions the bitmaps
+        can't decide count as colliding, without the exact test.
+        """
+        left, top, width, height = rect
+        if box[2] < 1 or box[3] < 1:
+            return numpy.array([
+                [self.collide_exact(
+                    [box[0] + x, box[1] + y, box[2], box[3]])
+                 for x in range(left, left + width)]
+                for y in range(top, top + height)], dtype=bool)
+        xs = numpy.arange(left, left + width)
+        ys = numpy.arange(top, top + height)
+        x0 = numpy.clip(
+            numpy.ceil(xs + box[0]).astype(int) - self.left, 0, self.width)
+        x1 = numpy.clip(
+            numpy.floor(xs + box[0] + box[2]).astype(int) - self.left + 1,
+            0, self.width)
+        y0 = numpy.clip(
+            numpy.ceil(ys + box[1]).astype(int) - self.top, 0, self.height)
+        y1 = numpy.clip(
+            numpy.floor(ys + box[1] + box[3]).astype(int) - self.top + 1,
+            0, self.height)
+        empty = (x0 >= x1)[None, :] | (y0 >= y1)[:, None]
+
+        def area_sums(table):
+            return (
+                table[y1[:, None], x1[None, :]] -
+                table[y0[:, None], x1[None, :]] -
+                table[y1[:, None], x0[None, :]] +
+                table[y0[:, None], x0[None, :]])
+
+        mask = (area_sums(self.occupied_table) > 0) & ~empty
+        uncertain = (area_sums(self.uncertain_table) > 0) & ~empty & ~mask
+        points = (y1 - y0)[:, None] * (x1 - x0)[None, :]
+        inner = uncertain & (area_sums(self.inner_table) == points)
+        mask |= inner
+        uncertain &= ~inner
+        if not exact:
+            return mask | uncertain
+        for row, column in zip(*numpy.nonzero(uncertain)):
+            position_box = list(box)
+            position_box[0] += left + column
+            position_box[1] += top + row
+            mask[row, column] = self.collide_exact(position_box)
+        return mask
+
+
+def is_integer_rect(rect):
+    return all(float(n).is_integer() for n in rect)
+
+
+def rect_to_polygon(rect):
+    x, y, width, height = rect
+    return [[x, y], [x + width, y], [x + width, y + height], [x, y + height]]
+
+
+def extent(rects, polygons, bounds):
+    left, top, width, height = bounds
+    xs = [left, left + width]
+    ys = [top, top + height]
+    for x, y, width, height in rects:
+        xs.extend((x, x + width))
+        ys.extend((y, y + height))
+    for polygon in polygons:
+        xs.extend(p[0] for p in polygon)
+        ys.extend(p[1] for p in polygon)
+    margin = math.ceil(BAND_WIDTH)
+    return (
+        math.floor(min(xs)) - margin, math.floor(min(ys)) - margin,
+        math.ceil(max(xs)) + margin, math.ceil(max(ys)) + margin)
+
+
+def summed_area_table(bitmap):
+    """
+    table[y, x] is the count of set pixels in bitmap[:y, :x].
+    """
+    height, width = bitmap.shape
+    table = numpy.zeros((height + 1, width + 1), dtype=numpy.int32)
+    table[1:, 1:] = bitmap.cumsum(axis=0).cumsum(axis=1)
+    return table
+
+
+def outline_distance(points, polygon):
+    """
+    Distance from each point to the closest edge of the closed polygon.
+    """
+    points = numpy.asarray(points, dtype=float)
+    result = numpy.full(len(points), numpy.inf)
+    vertices = numpy.asarray(polygon, dtype=float)
+    for a, b in zip(vertices, numpy.roll(vertices, -1, axis=0)):
+        segment = b - a
+        length = segment.dot(segment)
+        if length:
+            ratio = ((points - a) @ segment) / length
+            ratio = numpy.clip(ratio, 0, 1)
+        else:
+            ratio = numpy.zeros(len(points))
+        closest = a + ratio[:, None] * segment
+        distances = numpy.hypot(*(points - closest).T)
+        result = numpy.minimum(result, distances)
+    return result
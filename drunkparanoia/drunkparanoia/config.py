@@ -59,6 +59,95 @@ class COUNTDOWNS:
     INTERACTION_COOLDOWN_MAX = 350
 
 
+class NAVIGATION:
+    SIZE = 640, 360
+    CELL_SIZE = 8
+    PATH_CACHE_SIZE = 2048
+    # Max distance in cells to look for a walkable cell when a path starts or
+    # ends in an obstacle.
+    SNAP_RADIUS = 3
+
+
+class DESTINATIONS:
+    # Half size of the square where a random destination is picked when the
+    # character is outside every target origin.
+    FALLBACK_RADIUS = 75
+
+
+class SKINS:
+    KEY_COLOR = 0, 255, 0
+    # Store the sheets once in 8 bits with a palette per color variation
+    # instead of a recolored 32 bits copy of every frame per variation.
+    # Opt-in memory mode: the 8 bits frames are slower to blit.
+    INDEXED = False
+    # Build the color variations the first time a character uses them.
+    LAZY_VARIATIONS = True
+    # Let the preloader build every variation in the background, during the
+    # dispatch screen for the first round.
+    WARM_VARIATIONS = False
+    # Worker processes decoding every skin behind a progress screen at
+    # startup. 0 keeps building the skins on demand.
+    LOADER_WORKERS = int(os.environ.get('DRUNKPARANOIA_SKIN_WORKERS', 0))
+
+
+class ASSETS:
+    CATEGORIES = 'skins', 'variations', 'mirrors', 'scenes', 'ui'
+    # Bytes of pixels the images may keep resident. Over it, the least
+    # recently used regenerable images (mirrors, color variations) are
+    # evicted and rebuilt on their next use.
+    BUDGET = int(os.environ.get(
+        'DRUNKPARANOIA_ASSET_BUDGET', 256 * 1024 * 1024))
+    # Convert the images loaded by name to their cheapest blit format.
+    NORMALIZE = True
+    # Color keys tried for the images whose transparency is only 0 or 255.
+    KEY_COLORS = (0, 255, 0), (255, 0, 255), (0, 255, 255), (1, 2, 3)
+
+
+class SCENE_PACKAGE:
+    # Compiled scenes are written next to their json with this extension.
+    EXTENSION = '.pack'
+    # Bump it when the layout of the package or of its baked data changes.
+    VERSION = 3
+    ALIGNMENT = 64
+
+
+class REPLAY:
+    # Path of the replay written when the game exits. Setting it records the
+    # seed and the joysticks input of the session.
+    RECORD_FILE = os.environ.get('DRUNKPARANOIA_RECORD')
+    VERSION = 1
+    # Ticks between two state checksums used to detect a desync.
+    CHECKSUM_INTERVAL = 60
+
+
+class PROFILING:
+    BUFFER_SIZE = 200000
+    # Path of the Chrome trace written when the game exits. Setting it enables
+    # the frame profiler.
+    TRACE_FILE = os.environ.get('DRUNKPARANOIA_PROFILE')
+    # Path of the json startup report (imports and init steps timings).
+    # Setting it enables the startup profile mode.
+    STARTUP_REPORT = os.environ.get('DRUNKPARANOIA_STARTUP_PROFILE')
+    # Quit after this number of frames, 0 runs until the player quits.
+    MAX_FRAMES = int(os.environ.get('DRUNKPARANOIA_MAX_FRAMES', 0))
+
+
+class STARTUP:
+    # Time to first frame in seconds checked by scripts/check_startup.py
+    # under the dummy video driver.
+    BUDGET = 1.5
+
+
+class DECALS:
+    # Static vfx lying on the ground: stamped in the background of the round
+    # rather than sorted with the elements.
+    NAMES = 'vomit',
+    # Decals kept per round, the oldest are dropped past it.
+    MAX = 48
+    # Oldest decals fading out once the cap is reached.
+    FADE = 16
+
+
 class SPEED:
     MAX = 1.25
     MIN = .2
@@ -79,6 +168,8 @@ class CHARACTER_STATUSES:
     FREE = 'free'
     STUCK = 'stuck'
     DUELABLES = [FREE, AUTOPILOT, STUCK]
+    # The statuses where the vomit and duel check countdowns run.
+    WALKING = [FREE, AUTOPILOT]
 
 
 class ANIMATION_SIDES:
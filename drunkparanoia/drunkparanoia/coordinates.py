@@ -1,5 +1,4 @@
 import math
-from matplotlib.path import Path
 from drunkparanoia.config import DIRECTION_TO_VECTOR
 
 
@@ -61,12 +60,15 @@ def box_hit_polygon(rect, polygon):
     bl = [rect[0], rect[1] + rect[3]]
     br = [rect[0] + rect[2], rect[1] + rect[3]]
     rect = (tl, tr, bl, br)
+    # matplotlib is slow to import, it is loaded on first use.
+    from matplotlib.path import Path
     rect_path = Path(rect)
     polygon_path = Path(polygon)
     return rect_path.intersects_path(polygon_path, filled=True)
 
 
 def path_cross_polygon(path, polygon):
+    from matplotlib.path import Path
     return Path(path).intersects_path(Path(polygon))
 
 
@@ -75,6 +77,7 @@ def path_cross_rect(path, rect):
     tr = [rect[0] + rect[2], rect[1]]
     bl = [rect[0], rect[1] + rect[3]]
     br = [rect[0] + rect[2], rect[1] + rect[3]]
+    from matplotlib.path import Path
     path = Path(path)
     path2 = Path([tl, tr, bl, br])
     return path.intersects_path(path2)
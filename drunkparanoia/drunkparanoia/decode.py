@@ -0,0 +1,129 @@
+"""
+Decode every skin in a pool of worker processes. The workers decode the
+sheets, swap their colors and split the frames, then return raw pixels. The
+main process turns them into surfaces and registers them, as the serial
+loader would.
+"""
+import os
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy
+import pygame
+from drunkparanoia import io
+from drunkparanoia.config import GAMEROOT, SKINS
+
+
+def skin_datas():
+    directory = f'{GAMEROOT}/resources/animdata'
+    datas = []
+    for filename in sorted(os.listdir(directory)):
+        with open(f'{directory}/{filename}', 'r') as f:
+            datas.append(json.load(f))
+    return datas
+
+
+def skin_jobs(datas, indexed):
+    """
+    One job per sheet for the 8 bits skins, the variations are palettes set
+    on the main process. One job per sheet and variation otherwise.
+    """
+    jobs = {}
+    for data in datas:
+        for side in ('face', 'back'):
+            filepath = data['sheets'][side]
+            if indexed:
+                jobs[filepath, 0] = decode_indexed_sheet, (filepath,)
+                continue
+            variations = [None] + data['variations']
+            for i, variation in enumerate(variations):
+                jobs[filepath, i] = decode_frames, (
+                    filepath, data['framesize'], variation, i)
+    return list(jobs.values())
+
+
+def decode_indexed_sheet(filepath):
+    """
+    Worker: 8 bits pixels and palette of a sheet, no palette if it has more
+    than 256 colors.
+    """
+    surface = pygame.image.load(f'{GAMEROOT}/{filepath}')
+    values = io.packed_colors(surface)
+    colors, indexes = numpy.unique(values, return_inverse=True)
+    if len(colors) > 256:
+        return 'indexed', filepath, surface.get_size(), None, None
+    palette = [unpack_color(color) for color in colors]
+    pixels = indexes.astype(numpy.uint8).tobytes()
+    return 'indexed', filepath, surface.get_size(), pixels, palette
+
+
+def decode_frames(filepath, frame_size, variation=None, index=0):
+    """
+    Worker: RGB pixels of every frame of a sheet in a color variation.
+    """
+    surface = pygame.image.load(f'{GAMEROOT}/{filepath}')
+    values = io.packed_colors(surface)
+    if variation:
+        values = io.swap_packed_colors(values, variation)
+    pixels = io.unpacked_colors(values)
+    frames = [
+        pixels[y:y + h, x:x + w].tobytes()
+        for x, y, w, h in io.frame_rects(surface, frame_size, filepath)]
+    return 'frames', filepath, frame_size, variation, index, frames
+
+
+def unpack_color(value):
+    value = int(value)
+    return value >> 16, value >> 8 & 0xff, value & 0xff
+
+
+def store(result):
+    """
+    Main process: build the surfaces of a job result and register them.
+    """
+    if result[0] == 'indexed':
+        _, filepath, size, pixels, palette = result
+        sheet = None
+        if pixels is not None:
+            sheet = pygame.image.frombytes(pixels, size, 'P')
+            sheet.set_palette(palette)
+        io.store_indexed_sheet(filepath, sheet)
+        return
+
+    _, filepath, frame_size, variation, index, frames = result
+    images = [
+        pygame.image.frombytes(frame, frame_size, 'RGB').convert()
+        for frame in frames]
+    palette1 = palette2 = None
+    if variation:
+        palette1 = [colors[0] for colors in variation]
+        palette2 = [colors[1] for colors in variation]
+    io.store_frames(
+        filepath, frame_size, SKINS.KEY_COLOR, images, palette1, palette2,
+        index)
+
+
+def load_skins(workers=None, progress=None, indexed=None):
+    """
+    Decode every skin in worker processes and build all of them. The
+    progress function is called with the count of the jobs done and the
+    total count after each job.
+    """
+    indexed = SKINS.INDEXED if indexed is None else indexed
+    datas = skin_datas()
+    jobs = skin_jobs(datas, indexed)
+    results = []
+    # Spawned workers do not inherit the display of the main process.
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = [pool.submit(function, *args) for function, args in jobs]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if progress:
+                progress(len(results), len(jobs))
+    # The original colors frames are registered before their variations.
+    results.sort(key=lambda result: result[0] == 'frames' and result[4])
+    for result in results:
+        store(result)
+    for data in datas:
+        io.load_skin(data, indexed).load_all()
@@ -0,0 +1,81 @@
+"""
+Random walk destinations. The collision free positions of every target
+destination rectangle are computed once for a character box, so a valid
+destination is drawn without any retry. Out of the target origins, the
+destination is drawn around the character from the free map of the scene.
+"""
+import random
+import itertools
+import numpy
+from drunkparanoia.config import DESTINATIONS
+
+
+class DestinationSampler:
+    def __init__(self, scene, box, free_positions=None):
+        self.scene = scene
+        self.box = list(box)
+        self.targets = scene.targets
+        self.distributions = {}
+        if free_positions is not None:
+            self.free_positions = free_positions
+            return
+        # Flat indexes of the free positions for each destination rectangle.
+        self.free_positions = {}
+        for target in self.targets:
+            for rect in target['destinations']:
+                key = tuple(rect)
+                if key not in self.free_positions:
+                    mask = scene.collision_mask(rect, self.box)
+                    self.free_positions[key] = numpy.flatnonzero(~mask)
+
+    def distribution(self, target_indexes):
+        """
+        Each destination of a target is weighted by the target weight and its
+        free positions ratio, which matches the probability to draw it with
+        the former rejection sampling.
+        """
+        if target_indexes in self.distributions:
+            return self.distributions[target_indexes]
+        rects, masses = [], []
+        for index in target_indexes:
+            target = self.targets[index]
+            for rect in target['destinations']:
+                free = len(self.free_positions[tuple(rect)])
+                if not free:
+                    continue
+                rects.append(tuple(rect))
+                masses.append(target['weight'] * free / (rect[2] * rect[3]))
+        cumulated = list(itertools.accumulate(masses))
+        self.distributions[target_indexes] = rects, cumulated
+        return rects, cumulated
+
+    def choice(self, point):
+        target_indexes = self.scene.target_map.all(point)
+        rects, cumulated = self.distribution(target_indexes)
+        if not rects:
+            return self.choice_around(point)
+        rect = random.choices(rects, cum_weights=cumulated)[0]
+        positions = self.free_positions[rect]
+        index = positions[random.randrange(len(positions))]
+        row, column = divmod(int(index), rect[2])
+        return rect[0] + column, rect[1] + row
+
+    def choice_around(self, point):
+        """
+        Fallback for positions outside every target origin: a free position
+        in a square around the point.
+        """
+        radius = DESTINATIONS.FALLBACK_RADIUS
+        x, y = [int(n) for n in point]
+        free_map = self.scene.free_map(self.box)
+        height, width = free_map.shape
+        left, top = max(x - radius, 0), max(y - radius, 0)
+        right, bottom = min(x + radius, width), min(y + radius, height)
+        if left >= right or top >= bottom:
+            return x, y
+        positions = numpy.flatnonzero(free_map[top:bottom, left:right])
+        if not len(positions):
+            return x, y
+        index = positions[random.randrange(len(positions))]
+        row, column = divmod(int(index), right - left)
+        return left + column, top + row
@@ -1,37 +1,55 @@
-from drunkparanoia.config import DIRECTIONS, CHARACTER_STATUSES, DUEL
+import numpy
+from drunkparanoia.config import DUEL
 from drunkparanoia.coordinates import path_cross_rect
+from drunkparanoia.profiler import profiled
+from drunkparanoia.table import (
+    VERTICAL_DIRECTIONS, RIGHT_DIRECTIONS, LEFT_DIRECTIONS)
 
 
+def duel_candidates(table):
+    """
+    Return a square boolean matrix where [i, j] tells if the character at row
+    i faces the character at row j in a duel range. Obstacles are not
+    evaluated.
+    """
+    x = table.column('x')
+    y = table.column('y')
+    directions = table.column('direction')
+    duelable = table.duelable_mask()
+
+    dx = x[:, None] - x[None, :]
+    dy = y[:, None] - y[None, :]
+    distances = numpy.abs(dx)
+    # For an origin facing right, the target must be on its right and vice
+    # versa, a character looking up or down can't start a duel.
+    wrong_side = (
+        VERTICAL_DIRECTIONS[directions][:, None] |
+        (RIGHT_DIRECTIONS[directions][:, None] & (dx > 0)) |
+        (LEFT_DIRECTIONS[directions][:, None] & (dx < 0)))
+    candidates = (
+        duelable[:, None] & duelable[None, :] &
+        (numpy.abs(dy) <= DUEL.TOLERENCE) &
+        ~wrong_side &
+        (distances >= DUEL.RANGE[0]) & (distances <= DUEL.RANGE[1]))
+    numpy.fill_diagonal(candidates, False)
+    return candidates
+
+
+@profiled('find_possible_duels')
 def find_possible_duels(scene):
-    characters = scene.characters
+    table = scene.table
+    characters = table.characters
     possible_duels = []
-    for char1 in characters:
-        if char1.status not in CHARACTER_STATUSES.DUELABLES:
-            continue
+    candidates = duel_candidates(table)
+    for i in numpy.flatnonzero(candidates.any(axis=1)):
+        char1 = characters[i]
         duel = None
         duel_distance = None
 
-        for char2 in characters:
-            if char2.status not in CHARACTER_STATUSES.DUELABLES:
-                continue
-            if char1 == char2:
-                continue
-
-            height = char1.coordinates.y - char2.coordinates.y
-            if abs(height) > DUEL.TOLERENCE:
-                continue
-
-            x1 = char1.coordinates.x
-            x2 = char2.coordinates.x
+        for j in numpy.flatnonzero(candidates[i]):
+            char2 = characters[j]
             path = char1.coordinates.position, char2.coordinates.position
-            conditions = (
-                char1.direction in (DIRECTIONS.UP, DIRECTIONS.DOWN) or
-                char1.direction in DIRECTIONS.RIGHTS and (x1 - x2) > 0 or
-                char1.direction in DIRECTIONS.LEFTS and (x2 - x1) > 0 or
-                not (DUEL.RANGE[0] <= abs(x1 - x2) <= DUEL.RANGE[1]) or
-                any(path_cross_rect(path, fence) for fence in scene.fences))
-
-            if conditions:
+            if any(path_cross_rect(path, fence) for fence in scene.fences):
                 continue
 
             dist = char1.coordinates.distance_to(char2.coordinates)
@@ -43,4 +61,4 @@ def find_possible_duels(scene):
         if duel is not None and (duel[1], duel[0]) not in possible_duels:
             possible_duels.append(duel)
 
-    return possible_duels
\ No newline at end of file
+    return possible_duels
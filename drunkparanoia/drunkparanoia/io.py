@@ -1,13 +1,37 @@
 import os
 import json
 import pygame
+import numpy
+import functools
 import itertools
-from drunkparanoia.config import GAMEROOT
+import threading
+from collections import OrderedDict
+from drunkparanoia.config import GAMEROOT, SKINS, ASSETS
 from drunkparanoia.joystick import get_current_commands
 
 
 _animation_store = {}
-_image_store = {}
+_skins = {}
+# Image registry: a handle is the index of the image in _images. _mirrors
+# holds the handle of the horizontal mirror of each image (None while it is
+# not generated) and _handles the handles of the images loaded by name.
+_images = []
+_mirrors = []
+_handles = {}
+# Memory accounting: category of each image and bytes of the pixels it owns
+# (subsurfaces share the pixels of their parent and own none).
+_categories = []
+_sizes = []
+_resident_bytes = 0
+_regenerations = 0
+# Regenerable images: how to rebuild them once evicted, and the resident
+# ones from the least to the most recently used.
+_recipes = {}
+_recently_used = OrderedDict()
+# Skins may be built by the preloader thread while the game needs them.
+_skin_lock = threading.Lock()
+# Reentrant: regenerating an image may regenerate its source first.
+_registry_lock = threading.RLock()
 
 
 def load_main_resources():
@@ -39,27 +63,48 @@ def list_joysticks():
 
 
 def swap_colors(surface, palette1, palette2):
-    """ THX Chat GPT:"""
-    swapped_surface = pygame.Surface(surface.get_size())
-    original_pixels = pygame.PixelArray(surface)
-    swapped_pixels = pygame.PixelArray(swapped_surface)
-    for x in range(original_pixels.shape[0]):
-        for y in range(original_pixels.shape[1]):
-            color = original_pixels[x, y]
-            # Transform a bit pixel into a list comparable with palette data.
-            check = [color >> 16, color >> 8 & 0xff, color & 0xff]
-            if check in palette1:
-                index = palette1.index(check)
-                color = palette2[index]
-                swapped_color = color[0] << 16 | color[1] << 8 | color[2]
-            else:
-                swapped_color = color
-            swapped_pixels[x, y] = swapped_color
-    # PixelArray is expensive for memory, then we force an immediate delete.
-    # In case of the garbage collector would delay the memory clear to later.
-    del original_pixels
-    del swapped_pixels
-    return swapped_surface
+    """
+    Copy of a surface with the colors of palette1 replaced by the matching
+    colors of palette2.
+    """
+    variation = list(zip(palette1, palette2))
+    values = swap_packed_colors(packed_colors(surface), variation)
+    return pygame.image.frombytes(
+        unpacked_colors(values).tobytes(), surface.get_size(), 'RGB')
+
+
+def packed_colors(surface):
+    """
+    Pixels of a surface as 0xRRGGBB integers, rows first.
+    """
+    width, height = surface.get_size()
+    rgb = numpy.frombuffer(pygame.image.tobytes(surface, 'RGB'), numpy.uint8)
+    rgb = rgb.reshape(height, width, 3).astype(numpy.uint32)
+    return rgb[..., 0] << 16 | rgb[..., 1] << 8 | rgb[..., 2]
+
+
+def unpacked_colors(values):
+    """
+    RGB channels of 0xRRGGBB integers, on a last axis of the array.
+    """
+    rgb = numpy.empty(values.shape + (3, ), dtype=numpy.uint8)
+    rgb[..., 0] = values >> 16
+    rgb[..., 1] = values >> 8 & 0xff
+    rgb[..., 2] = values & 0xff
+    return rgb
+
+
+def swap_packed_colors(values, variation):
+    """
+    Replace the source colors of a variation by their target colors, the
+    first matching entry of the variation wins.
+    """
+    result = values.copy()
+    for source, target in reversed(variation):
+        source = source[0] << 16 | source[1] << 8 | source[2]
+        target = target[0] << 16 | target[1] << 8 | target[2]
+        result[values == source] = target
+    return result
 
 
 def load_skins():
@@ -68,27 +113,64 @@ def load_skins():
     for skin in skins:
         with open(skin, 'r') as f:
             data = json.load(f)
-        load_skin(data)
-
-
-def load_skin(data):
-    size = data['framesize']
-    sheets = data["sheets"]
-    # Build original colors skin.
-    result = [{
-        side: load_frames(sheets[side], size, (0, 255, 0))
-        for side in ('face', 'back')}]
-    # Build color variations
-    for i, variation in enumerate(data['variations']):
-        palette1 = [colors[0] for colors in variation]
-        palette2 = [colors[1] for colors in variation]
-        skin = {}
-        for side in ('face', 'back'):
-            image = load_frames(
-                sheets[side], size, (0, 255, 0), palette1, palette2, i + 1)
-            skin[side] = image
-        result.append(skin)
-    return result
+        load_skin(data).load_all()
+
+
+def load_skin(data, indexed=None):
+    indexed = SKINS.INDEXED if indexed is None else indexed
+    key = data['sheets']['face'], data['sheets']['back'], indexed
+    with _skin_lock:
+        if key not in _skins:
+            _skins[key] = Skin(data, indexed)
+        skin = _skins[key]
+    if not SKINS.LAZY_VARIATIONS:
+        skin.load_all()
+    return skin
+
+
+class Skin:
+    """
+    Frames handles of an animation data per color variation, each variation
+    is built the first time it is used:
+        skin[variation][side][frame]
+    """
+
+    def __init__(self, data, indexed):
+        self.data = data
+        self.indexed = indexed
+        self.variations = [None] * (len(data['variations']) + 1)
+
+    def __len__(self):
+        return len(self.variations)
+
+    def __getitem__(self, variation):
+        return self.variations[variation] or self.load(variation)
+
+    def load(self, variation):
+        with _skin_lock:
+            if self.variations[variation] is None:
+                self.variations[variation] = {
+                    side: self.load_side(side, variation)
+                    for side in ('face', 'back')}
+            return self.variations[variation]
+
+    def load_all(self):
+        for variation in range(len(self)):
+            self.load(variation)
+
+    def load_side(self, side, variation):
+        filepath = self.data['sheets'][side]
+        size = self.data['framesize']
+        variations = self.data['variations']
+        if self.indexed:
+            return load_indexed_frames(
+                filepath, size, SKINS.KEY_COLOR, variations, variation)
+        if not variation:
+            return load_frames(filepath, size, SKINS.KEY_COLOR)
+        palette1 = [colors[0] for colors in variations[variation - 1]]
+        palette2 = [colors[1] for colors in variations[variation - 1]]
+        return load_frames(
+            filepath, size, SKINS.KEY_COLOR, palette1, palette2, variation)
 
 
 def load_frames(
@@ -97,14 +179,64 @@ def load_frames(
     """
     Split a huge sheet in memory.
     """
-    filepath = f'{GAMEROOT}/{filepath}'
-    filename_id = f'{GAMEROOT}/{filepath}.{variation}'
+    filename_id = frames_id(filepath, variation)
     if _animation_store.get(filename_id):
         return _animation_store.get(filename_id, [])
 
-    sheet = pygame.image.load(filepath).convert()
+    sheet = pygame.image.load(f'{GAMEROOT}/{filepath}').convert()
     if palette1 and palette2:
         sheet = swap_colors(sheet, palette1, palette2)
+    images = []
+    for x, y, width, height in frame_rects(sheet, frame_size, filepath):
+        image = pygame.Surface([width, height]).convert()
+        image.blit(sheet, (0, 0), (x, y, width, height))
+        images.append(image)
+    return store_frames(
+        filepath, frame_size, key_color, images, palette1, palette2,
+        variation)
+
+
+def frames_id(filepath, variation):
+    return f'{GAMEROOT}/{filepath}.{variation}'
+
+
+def store_frames(
+        filepath, frame_size, key_color, images,
+        palette1=None, palette2=None, variation=0, mirrors=None,
+        normalize=None):
+    """
+    Register the frames of a sheet already split, e.g. by a worker process,
+    and their mirrors, generated if they are not given. The frames are in
+    the display format, their color key is RLE accelerated unless normalize
+    is False, e.g. for frames wrapping shared pixels.
+    """
+    normalize = ASSETS.NORMALIZE if normalize is None else normalize
+    flags = pygame.RLEACCEL if normalize else 0
+    originals = None
+    if palette1 and palette2:
+        # Evicted variation frames are recolored back from the originals.
+        originals = load_frames(filepath, frame_size, key_color)
+    handles = []
+    for i, image in enumerate(images):
+        image.set_colorkey(key_color, flags)
+        if originals is None:
+            handle = register_image(image, 'skins')
+        else:
+            recipe = functools.partial(
+                recolor_image, originals[i], palette1, palette2, key_color)
+            handle = register_image(image, 'variations', recipe)
+        if mirrors is not None:
+            mirrors[i].set_colorkey(key_color, flags)
+            link_mirror(handle, register_image(mirrors[i], 'mirrors'))
+        # Characters are flipped when they face left, the mirrors are
+        # generated with the frames.
+        image_mirror(handle)
+        handles.append(handle)
+    _animation_store[frames_id(filepath, variation)] = handles
+    return handles
+
+
+def frame_rects(sheet, frame_size, filepath):
     width, height = frame_size
     row = sheet.get_height() / height
     col = sheet.get_width() / width
@@ -113,33 +245,344 @@ def load_frames(
             f"the sprite sheet file {filepath} size doesn't "
             "match with his block size")
         raise ValueError(message)
-    ids = []
+    return [
+        (i * width, j * height, width, height)
+        for j, i in itertools.product(range(int(row)), range(int(col)))]
 
-    for j, i in itertools.product(range(int(row)), range(int(col))):
-        image = pygame.Surface([width, height]).convert()
-        x, y = i * width, j * height
-        image.blit(sheet, (0, 0), (x, y, width, height))
-        image.set_colorkey(key_color)
-        id_ = f'{filename_id}[{i}.{j}]'
-        _image_store[id_] = image
-        ids.append(id_)
-    _animation_store[filename_id] = ids
-    return ids
+
+def load_indexed_frames(
+        filepath, frame_size, key_color, variations, variation):
+    """
+    Split a sheet in 8 bits frames in a color variation. The pixels of the
+    sheet and of its mirror are stored once: the frames are subsurfaces
+    sharing them, each variation is a palette set on its own subsurfaces.
+    Sheets of more than 256 colors are recolored instead.
+    """
+    filename_id = f'{GAMEROOT}/{filepath}.indexed.{variation}'
+    if filename_id in _animation_store:
+        return _animation_store[filename_id]
+
+    sheets = indexed_sheets(filepath)
+    if sheets is None:
+        if not variation:
+            handles = load_frames(filepath, frame_size, key_color)
+        else:
+            palette1 = [colors[0] for colors in variations[variation - 1]]
+            palette2 = [colors[1] for colors in variations[variation - 1]]
+            handles = load_frames(
+                filepath, frame_size, key_color, palette1, palette2,
+                variation)
+        _animation_store[filename_id] = handles
+        return handles
+
+    sheet, flipped = sheets
+    palette = [tuple(color)[:3] for color in sheet.get_palette()]
+    key_color = tuple(key_color)
+    key = palette.index(key_color) if key_color in palette else None
+    if variation:
+        palette = variation_palette(palette, variations[variation - 1])
+    category = 'variations' if variation else 'skins'
+    handles = []
+    for x, y, width, height in frame_rects(sheet, frame_size, filepath):
+        mirror_x = sheet.get_width() - x - width
+        frame = sheet.subsurface((x, y, width, height))
+        mirror = flipped.subsurface((mirror_x, y, width, height))
+        for image in (frame, mirror):
+            image.set_palette(palette)
+            if key is not None:
+                image.set_colorkey(key)
+        handle = register_image(frame, category)
+        link_mirror(handle, register_image(mirror, 'mirrors'))
+        handles.append(handle)
+    _animation_store[filename_id] = handles
+    return handles
+
+
+def indexed_sheets(filepath):
+    """
+    8 bits sheet and its mirror shared by the variations, None if the sheet
+    has more than 256 colors.
+    """
+    filename_id = f'{GAMEROOT}/{filepath}.indexed'
+    if filename_id in _animation_store:
+        return _animation_store[filename_id]
+    sheet = indexed_surface(
+        pygame.image.load(f'{GAMEROOT}/{filepath}').convert())
+    return store_indexed_sheet(filepath, sheet)
+
+
+def store_indexed_sheet(filepath, sheet, flipped=None):
+    """
+    Register an 8 bits sheet, e.g. decoded by a worker process, and its
+    mirror, generated if it is not given. None stands for a sheet of more
+    than 256 colors.
+    """
+    sheets = None
+    if sheet is not None:
+        if flipped is None:
+            flipped = pygame.transform.flip(sheet, True, False)
+        # The frames are subsurfaces: the sheets hold the pixels in the
+        # accounting.
+        register_image(sheet, 'skins')
+        register_image(flipped, 'mirrors')
+        sheets = sheet, flipped
+    _animation_store[f'{GAMEROOT}/{filepath}.indexed'] = sheets
+    return sheets
+
+
+def indexed_surface(surface):
+    """
+    8 bits copy of a surface with its exact colors as palette, or None if it
+    has more than 256 colors.
+    """
+    pixels = pygame.surfarray.array2d(surface)
+    values, indexes = numpy.unique(pixels, return_inverse=True)
+    if len(values) > 256:
+        return
+    colors = [tuple(surface.unmap_rgb(int(value)))[:3] for value in values]
+    result = pygame.Surface(surface.get_size(), depth=8)
+    result.set_palette(colors)
+    indexes = indexes.reshape(pixels.shape).astype(numpy.uint8)
+    pygame.surfarray.blit_array(result, indexes)
+    return result
+
+
+def variation_palette(palette, variation):
+    """
+    Apply a color variation to a palette, as swap_colors does on pixels.
+    """
+    palette1 = [colors[0] for colors in variation]
+    palette2 = [colors[1] for colors in variation]
+    return [
+        tuple(palette2[palette1.index(list(color))])
+        if list(color) in palette1 else color
+        for color in palette]
+
+
+def register_image(image, category, recipe=None):
+    """
+    Add an image to the registry and return its handle. An image with a
+    recipe, the function building it, may be evicted to respect the memory
+    budget and is rebuilt on its next use.
+    """
+    global _resident_bytes
+    with _registry_lock:
+        handle = len(_images)
+        _images.append(image)
+        _mirrors.append(None)
+        _categories.append(category)
+        _sizes.append(pixels_size(image))
+        _resident_bytes += _sizes[handle]
+        if recipe is not None:
+            _recipes[handle] = recipe
+            _recently_used[handle] = None
+            evict_images()
+        return handle
+
+
+def get_image(handle):
+    image = _images[handle]
+    if image is None:
+        return regenerate_image(handle)
+    if handle in _recently_used:
+        try:
+            _recently_used.move_to_end(handle)
+        except KeyError:
+            # Evicted meanwhile by another thread, the image is still valid.
+            pass
+    return image
+
+
+def regenerate_image(handle):
+    global _resident_bytes, _regenerations
+    with _registry_lock:
+        if _images[handle] is not None:
+            return _images[handle]
+        recipe = _recipes.get(handle)
+        if recipe is None:
+            raise ValueError(f'Unknown image handle {handle}.')
+        image = recipe()
+        _images[handle] = image
+        _sizes[handle] = pixels_size(image)
+        _resident_bytes += _sizes[handle]
+        _recently_used[handle] = None
+        _regenerations += 1
+        evict_images()
+        return image
+
+
+def evict_images(budget=None):
+    """
+    Release the least recently used regenerable images until the pixels fit
+    in the budget. The most recently used one is always kept.
+    """
+    global _resident_bytes
+    budget = ASSETS.BUDGET if budget is None else budget
+    with _registry_lock:
+        while _resident_bytes > budget and len(_recently_used) > 1:
+            handle, _ = _recently_used.popitem(last=False)
+            _images[handle] = None
+            _resident_bytes -= _sizes[handle]
+
+
+def pixels_size(image):
+    if image.get_parent() is not None:
+        return 0
+    return image.get_pitch() * image.get_height()
+
+
+def memory_usage():
+    """
+    Resident images and bytes per category, with the bytes which may be
+    evicted and the count of images currently evicted.
+    """
+    usage = {
+        category: {'images': 0, 'bytes': 0, 'evictable': 0, 'evicted': 0}
+        for category in ASSETS.CATEGORIES}
+    with _registry_lock:
+        for handle, image in enumerate(_images):
+            stats = usage[_categories[handle]]
+            if image is None:
+                stats['evicted'] += handle in _recipes
+                continue
+            stats['images'] += 1
+            stats['bytes'] += _sizes[handle]
+            if handle in _recipes:
+                stats['evictable'] += _sizes[handle]
+    return usage
+
+
+def format_memory_usage(usage=None):
+    usage = usage or memory_usage()
+    header = (
+        f'{"category":<12}{"images":>8}{"MB":>9}'
+        f'{"evictable MB":>14}{"evicted":>9}')
+    lines = [header, '-' * len(header)]
+    for category, stats in usage.items():
+        lines.append(
+            f'{category:<12}{stats["images"]:>8}'
+            f'{stats["bytes"] / 1024 ** 2:>9.2f}'
+            f'{stats["evictable"] / 1024 ** 2:>14.2f}{stats["evicted"]:>9}')
+    total = sum(stats['bytes'] for stats in usage.values())
+    lines.append(
+        f'{"total":<12}{"":>8}{total / 1024 ** 2:>9.2f}  '
+        f'budget {ASSETS.BUDGET / 1024 ** 2:.1f} MB, '
+        f'{_regenerations} regeneration(s)')
+    return '\n'.join(lines)
+
+
+def registered_images():
+    """
+    Handle, category and image of every resident image.
+    """
+    with _registry_lock:
+        return [
+            (handle, _categories[handle], image)
+            for handle, image in enumerate(_images) if image is not None]
+
+
+def loaded_images():
+    """
+    Handles of the images loaded by name.
+    """
+    return dict(_handles)
 
 
-def get_image(image_id):
-    return _image_store.get(image_id)
+def image_handle(filename):
+    """
+    Handle of an image loaded by name or None.
+    """
+    return _handles.get(filename)
 
 
-def load_image(filename, key_color=None, flipped=False):
-    if _image_store.get(filename) and flipped is False:
-        return filename
+def load_image(filename, key_color=None):
+    if filename in _handles:
+        return _handles[filename]
     filepath = f'{GAMEROOT}/{filename}'
     image = pygame.image.load(filepath).convert_alpha()
-    if key_color is not None:
+    return store_image(filename, image, key_color)
+
+
+def store_image(filename, image, key_color=None, normalize=None):
+    """
+    Register an image already decoded, e.g. restored from a scene package.
+    The image is converted to its cheapest blit format unless normalize is
+    False, e.g. for an image wrapping shared pixels.
+    """
+    normalize = ASSETS.NORMALIZE if normalize is None else normalize
+    if normalize:
+        image = blit_format(image, key_color)
+    elif key_color is not None:
         image.set_colorkey(key_color)
-    _image_store[filename] = image
-    return filename
+    category = 'ui' if 'resources/ui/' in filename else 'scenes'
+    _handles[filename] = register_image(image, category)
+    return _handles[filename]
+
+
+def blit_format(image, key_color=None):
+    """
+    Copy of an image in the cheapest format blitting the same pixels: the
+    display format, with a RLE accelerated color key for the transparent
+    pixels if the alpha channel is only 0 or 255. Only the images with
+    partial transparency keep their per pixel alpha.
+    """
+    if not image.get_flags() & pygame.SRCALPHA:
+        image = image.convert()
+        if key_color is not None:
+            image.set_colorkey(key_color, pygame.RLEACCEL)
+        return image
+
+    alpha = pygame.surfarray.array_alpha(image)
+    opaque = alpha == 255
+    transparent = alpha == 0
+    if not numpy.all(opaque | transparent):
+        if key_color is not None:
+            image.set_colorkey(key_color)
+        return image
+
+    result = image.convert()
+    if numpy.any(transparent):
+        colors = pygame.surfarray.array3d(image)
+        if key_color is None:
+            key_color = unused_color(colors[opaque])
+            if key_color is None:
+                return image
+        colors[transparent] = key_color
+        pygame.surfarray.blit_array(result, colors)
+    if key_color is not None:
+        result.set_colorkey(key_color, pygame.RLEACCEL)
+    return result
+
+
+def unused_color(colors):
+    """
+    A color key candidate absent of an array of rgb colors, or None.
+    """
+    values = set(numpy.unique(
+        colors[:, 0].astype(numpy.uint32) << 16 |
+        colors[:, 1].astype(numpy.uint32) << 8 | colors[:, 2]).tolist())
+    for color in ASSETS.KEY_COLORS:
+        if (color[0] << 16 | color[1] << 8 | color[2]) not in values:
+            return color
+
+
+def unload_image(filename):
+    """
+    Release an image loaded by name and its mirror. Their handles must not
+    be used anymore.
+    """
+    global _resident_bytes
+    with _registry_lock:
+        handle = _handles.pop(filename)
+        mirror = _mirrors[handle]
+        for handle in (handle, mirror):
+            if handle is None:
+                continue
+            if _images[handle] is not None:
+                _resident_bytes -= _sizes[handle]
+            _images[handle] = _mirrors[handle] = None
+            _recipes.pop(handle, None)
+            _recently_used.pop(handle, None)
 
 
 def load_data(filename):
@@ -148,17 +591,32 @@ def load_data(filename):
         return json.load(f)
 
 
-def image_mirror(id_, horizontal=True, vertical=False):
-    if not _image_store.get(id_):
-        raise ValueError(f'Unknown image id {id_}. Cannot generate a mirror.')
-    flip_id = f'{id_}['
-    if horizontal:
-        flip_id += 'h'
-    if vertical:
-        flip_id += 'v'
-    flip_id += ']'
-    if not _image_store.get(flip_id):
-        image = _image_store[id_]
-        mirror = pygame.transform.flip(image, horizontal, vertical)
-        _image_store[flip_id] = mirror
-    return flip_id
+def image_mirror(handle):
+    """
+    Handle of the horizontal mirror of an image, generated on first request.
+    """
+    mirror = _mirrors[handle]
+    if mirror is None:
+        with _registry_lock:
+            if _mirrors[handle] is not None:
+                return _mirrors[handle]
+            image = flip_image(handle)
+            recipe = functools.partial(flip_image, handle)
+            mirror = register_image(image, 'mirrors', recipe)
+            link_mirror(handle, mirror)
+    return mirror
+
+
+def flip_image(handle):
+    return pygame.transform.flip(get_image(handle), True, False)
+
+
+def recolor_image(handle, palette1, palette2, key_color):
+    image = swap_colors(get_image(handle), palette1, palette2).convert()
+    image.set_colorkey(key_color, pygame.RLEACCEL)
+    return image
+
+
+def link_mirror(handle, mirror):
+    _mirrors[handle] = mirror
+    _mirrors[mirror] = handle
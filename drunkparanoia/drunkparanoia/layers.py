@@ -0,0 +1,191 @@
+"""
+Render layers cached from frame to frame: the ground decals, the duel
+indicators and the HUD.
+"""
+import math
+import numpy
+import pygame
+from drunkparanoia.config import DECALS
+from drunkparanoia.io import blit_format, get_image
+
+
+class DecalLayer:
+    """
+    Ground vfx of a round stamped once in a copy of the backgrounds, instead
+    of being sorted and blitted with the elements every frame. The decals
+    are recorded by the simulation and stamped on the next render. Once
+    DECALS.MAX is reached, the layer is rebuilt on every new decal with the
+    DECALS.FADE oldest ones fading out, past it the oldest are dropped.
+    """
+
+    def __init__(self, backgrounds):
+        self.backgrounds = backgrounds
+        self.decals = []
+        self.surface = None
+        self.stamped = 0
+
+    def __len__(self):
+        return len(self.decals)
+
+    def add(self, image, position):
+        self.decals.append((image, position))
+        if len(self.decals) > DECALS.MAX:
+            del self.decals[0]
+        if len(self.decals) == DECALS.MAX:
+            self.surface = None
+
+    def image(self, size):
+        """
+        Backgrounds and decals composited on a surface of the given size.
+        """
+        if self.surface is None:
+            self.surface = pygame.Surface(size).convert()
+            for background in self.backgrounds:
+                image = get_image(background.image)
+                self.surface.blit(image, background.position)
+            self.stamped = 0
+        for i in range(self.stamped, len(self.decals)):
+            image, position = self.decals[i]
+            image = get_image(image)
+            if len(self.decals) == DECALS.MAX and i < DECALS.FADE:
+                image = image.copy()
+                image.set_alpha(255 * (i + 1) // (DECALS.FADE + 1))
+            self.surface.blit(image, position)
+        self.stamped = len(self.decals)
+        return self.surface
+
+
+class DuelLayer:
+    """
+    Duel indicators drawn on a transparent layer reused from frame to frame.
+    The lines are given as {pair: (start, end)}. Each pair is drawn once on
+    its own small surface, kept while its ends do not move. When a line
+    appears, disappears or moves, only its area of the layer is cleared and
+    the cached pairs crossing it are blitted back.
+    """
+
+    def __init__(self, color, width, alpha, dashed=False):
+        self.color = color
+        self.width = width
+        self.alpha = alpha
+        self.dashed = dashed
+        self.lines = {}
+        self.pairs = {}
+        self.surface = None
+        self.rect = None
+
+    def update(self, lines, size):
+        if self.surface is None:
+            self.surface = pygame.Surface(size, pygame.SRCALPHA)
+            self.surface.set_alpha(self.alpha)
+        elif lines == self.lines:
+            return
+        dirty = []
+        for pair in self.pairs.keys() - lines.keys():
+            dirty.append(self.pairs.pop(pair)[2])
+        for pair, ends in lines.items():
+            cached = self.pairs.get(pair)
+            if cached is not None and cached[0] == ends:
+                continue
+            if cached is not None:
+                dirty.append(cached[2])
+            image, rect = self.draw_line(*ends)
+            self.pairs[pair] = ends, image, rect
+            dirty.append(rect)
+        for area in dirty:
+            self.surface.set_clip(area)
+            self.surface.fill((0, 0, 0, 0))
+            for _, image, rect in self.pairs.values():
+                if rect.colliderect(area):
+                    self.surface.blit(image, rect)
+        self.surface.set_clip(None)
+        rects = [rect for _, _, rect in self.pairs.values()]
+        self.rect = rects[0].unionall(rects[1:]) if rects else None
+        self.lines = lines
+
+    def draw_line(self, start, end):
+        """
+        Surface of the line and its rect on the layer.
+        """
+        segments = self.line_segments(start, end)
+        xs = [int(x) for segment in segments for x, _ in segment] or [0]
+        ys = [int(y) for segment in segments for _, y in segment] or [0]
+        rect = pygame.Rect(
+            min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)
+        rect.inflate_ip(self.width * 2 + 2, self.width * 2 + 2)
+        image = pygame.Surface(rect.size, pygame.SRCALPHA)
+        for start, end in segments:
+            start = start[0] - rect.x, start[1] - rect.y
+            end = end[0] - rect.x, end[1] - rect.y
+            pygame.draw.line(image, self.color, start, end, self.width)
+        return image, rect
+
+    def line_segments(self, start, end):
+        if self.dashed:
+            return dashed_segments(start, end)
+        return [(start, end)]
+
+    def render(self, screen):
+        if self.rect:
+            screen.blit(self.surface, self.rect, self.rect)
+
+
+class HudLayer:
+    """
+    Images of the HUD composited once on a cached surface. The images are
+    given as [(image, position)], the surface is rebuilt only when one of
+    them changes (a life bucket, a bullet turning on or off).
+    """
+
+    def __init__(self):
+        self.images = None
+        self.surface = None
+        self.rect = None
+
+    def update(self, images):
+        if images == self.images:
+            return
+        rects = [
+            pygame.Rect(position, get_image(image).get_size())
+            for image, position in images]
+        self.rect = rects[0].unionall(rects[1:])
+        surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        offset = -self.rect.x, -self.rect.y
+        for (image, _), rect in zip(images, rects):
+            surface.blit(get_image(image), rect.move(offset))
+        self.surface = blit_format(surface)
+        self.images = images
+
+    def render(self, screen):
+        screen.blit(self.surface, self.rect)
+
+
+def dashed_segments(start_pos, end_pos, dash_length=4):
+    """
+    https://codereview.stackexchange.com/questions/70143/drawing-a-dashed-line-with-pygame
+    """
+    x1, y1 = (int(n) for n in start_pos)
+    x2, y2 = (int(n) for n in end_pos)
+    dl = dash_length
+
+    if x1 == x2:
+        ycoords = list(range(y1, y2, dl if y1 < y2 else -dl))
+        xcoords = [x1] * len(ycoords)
+    elif y1 == y2:
+        xcoords = list(range(x1, x2, dl if x1 < x2 else -dl))
+        ycoords = [y1] * len(xcoords)
+    else:
+        a = abs(x2 - x1)
+        b = abs(y2 - y1)
+        c = round(math.sqrt(a**2 + b**2))
+        dx = dl * a / c
+        dy = dl * b / c
+
+        xcoords = list(numpy.arange(x1, x2, dx if x1 < x2 else -dx))
+        ycoords = list(numpy.arange(y1, y2, dy if y1 < y2 else -dy))
+
+    next_coords = list(zip(xcoords[1::2], ycoords[1::2]))
+    last_coords = list(zip(xcoords[::2], ycoords[::2]))
+    return [
+        ((round(x1), round(y1)), (round(x2), round(y2)))
+        for (x1, y1), (x2, y2) in zip(next_coords, last_coords)]
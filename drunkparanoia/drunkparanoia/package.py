@@ -0,0 +1,114 @@
+"""
+Binary container of the compiled scenes. A package is a header, a json
+manifest and raw numpy arrays. The arrays are aligned in the file so the
+loader maps them in memory without parsing nor copying.
+"""
+import math
+import json
+import mmap
+import struct
+import numpy
+from drunkparanoia.config import SCENE_PACKAGE
+
+
+MAGIC = b'DRUNKPKG'
+# Magic, format version, manifest size.
+HEADER = struct.Struct('<8sII')
+
+
+def align(offset):
+    alignment = SCENE_PACKAGE.ALIGNMENT
+    return math.ceil(offset / alignment) * alignment
+
+
+def package_layout(manifest, arrays):
+    """
+    Header and manifest bytes of a package, offset of each array from the
+    start of the package and total size.
+    """
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        entries[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset}
+        offset = align(offset + array.nbytes)
+    manifest = dict(manifest, arrays=entries)
+    encoded = json.dumps(manifest).encode('utf-8')
+    start = align(HEADER.size + len(encoded))
+    head = HEADER.pack(MAGIC, SCENE_PACKAGE.VERSION, len(encoded)) + encoded
+    offsets = {
+        name: start + entry['offset'] for name, entry in entries.items()}
+    return head, offsets, start + offset
+
+
+def contiguous_arrays(arrays):
+    return {
+        name: numpy.ascontiguousarray(array)
+        for name, array in arrays.items()}
+
+
+def write_package(filepath, manifest, arrays):
+    arrays = contiguous_arrays(arrays)
+    head, offsets, _ = package_layout(manifest, arrays)
+    with open(filepath, 'wb') as f:
+        f.write(head)
+        for name, array in arrays.items():
+            f.seek(offsets[name])
+            f.write(array.tobytes())
+
+
+def pack_package(buffer, manifest, arrays):
+    """
+    Write a package in a writable buffer of package_size bytes, e.g. a
+    shared memory block.
+    """
+    arrays = contiguous_arrays(arrays)
+    head, offsets, _ = package_layout(manifest, arrays)
+    buffer[:len(head)] = head
+    for name, array in arrays.items():
+        target = numpy.frombuffer(
+            buffer, dtype=array.dtype, count=array.size,
+            offset=offsets[name])
+        target[:] = array.ravel()
+
+
+def package_size(manifest, arrays):
+    return package_layout(manifest, contiguous_arrays(arrays))[2]
+
+
+def read_package(filepath):
+    """
+    Return the manifest and the arrays of the package. The arrays are read
+    only views on the memory mapped file.
+    """
+    with open(filepath, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return unpack_package(buffer, filepath)
+
+
+def unpack_package(buffer, source):
+    """
+    Manifest and arrays of a package held in a buffer. The arrays are views
+    on the buffer.
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError(f'{source} is not a scene package.')
+    magic, version, size = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError(f'{source} is not a scene package.')
+    if version != SCENE_PACKAGE.VERSION:
+        raise ValueError(
+            f'{source} package version {version} is not supported, '
+            f'expected {SCENE_PACKAGE.VERSION}.')
+    manifest = json.loads(bytes(buffer[HEADER.size:HEADER.size + size]))
+    start = align(HEADER.size + size)
+    arrays = {}
+    for name, entry in manifest['arrays'].items():
+        dtype = numpy.dtype(entry['dtype'])
+        count = math.prod(entry['shape'])
+        array = numpy.frombuffer(
+            buffer, dtype=dtype, count=count, offset=start + entry['offset'])
+        arrays[name] = array.reshape(entry['shape'])
+    return manifest, arrays
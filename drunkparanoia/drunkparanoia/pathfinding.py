@@ -0,0 +1,233 @@
+"""
+Obstacle aware path finding. The static collision geometry of a scene is
+baked into a navigation grid for a given character box, paths are searched
+with an 8 directions A* and cached between cells. A cell is walkable when
+the box is free at every position of the cell, so the moves between the
+centers of walkable cells never hit the scene. The moves from the origin
+and to the destination are checked on the free map of the scene.
+"""
+import math
+import heapq
+from collections import OrderedDict
+import numpy
+from drunkparanoia.config import NAVIGATION
+
+
+NEIGHBOURS = (
+    (1, 0, 1), (-1, 0, 1), (0, 1, 1), (0, -1, 1),
+    (1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)),
+    (-1, 1, math.sqrt(2)), (-1, -1, math.sqrt(2)))
+
+
+class NavigationGrid:
+    def __init__(
+            self, scene, box, size=None, cell_size=None, cache_size=None,
+            walkable=None):
+        self.box = list(box)
+        self.cell_size = cell_size or NAVIGATION.CELL_SIZE
+        self.width, self.height = size or NAVIGATION.SIZE
+        self.columns = math.ceil(self.width / self.cell_size)
+        self.rows = math.ceil(self.height / self.cell_size)
+        self.cache_size = cache_size or NAVIGATION.PATH_CACHE_SIZE
+        self.cache = OrderedDict()
+        self.free_map = scene.free_map(self.box)
+        if walkable is None:
+            walkable = self.bake()
+        self.walkable = walkable
+
+    def bake(self):
+        """
+        A cell is walkable if the character box is free at every integer
+        position of the cell.
+        """
+        size = self.cell_size
+        walkable = []
+        for row in range(self.rows):
+            walkable.append([])
+            for column in range(self.columns):
+                cell = self.free_map[
+                    row * size:(row + 1) * size,
+                    column * size:(column + 1) * size]
+                walkable[-1].append(bool(cell.size and cell.all()))
+        return walkable
+
+    def cell_at(self, position):
+        column = int(position[0] // self.cell_size)
+        row = int(position[1] // self.cell_size)
+        return column, row
+
+    def cell_center(self, cell):
+        half = self.cell_size / 2
+        return cell[0] * self.cell_size + half, cell[1] * self.cell_size + half
+
+    def is_walkable(self, cell):
+        column, row = cell
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return False
+        return self.walkable[row][column]
+
+    def nearest_walkable(self, cell, radius=None):
+        return next(self.walkables_around(cell, radius), None)
+
+    def walkables_around(self, cell, radius=None):
+        """
+        Walkable cells at most radius cells away, the closest first.
+        """
+        if self.is_walkable(cell):
+            yield cell
+        radius = radius or NAVIGATION.SNAP_RADIUS
+        column, row = cell
+        for distance in range(1, radius + 1):
+            ring = [
+                (column + i, row + j)
+                for i in range(-distance, distance + 1)
+                for j in range(-distance, distance + 1)
+                if max(abs(i), abs(j)) == distance]
+            ring = [c for c in ring if self.is_walkable(c)]
+            yield from sorted(ring, key=lambda c: math.dist(c, cell))
+
+    def is_free(self, start, end):
+        """
+        Tell if the box is free all along a segment: at every integer step,
+        on the integer positions around each point.
+        """
+        (x1, y1), (x2, y2) = start, end
+        steps = math.ceil(max(abs(x2 - x1), abs(y2 - y1))) + 1
+        xs = numpy.linspace(x1, x2, steps)
+        ys = numpy.linspace(y1, y2, steps)
+        columns = numpy.concatenate((numpy.floor(xs), numpy.ceil(xs)))
+        rows = numpy.concatenate((numpy.floor(ys), numpy.ceil(ys)))
+        height, width = self.free_map.shape
+        if columns.min() < 0 or rows.min() < 0:
+            return False
+        if columns.max() >= width or rows.max() >= height:
+            return False
+        columns = columns.astype(int)
+        rows = rows.astype(int)
+        half = len(xs)
+        return bool(
+            self.free_map[rows[:half], columns[:half]].all() and
+            self.free_map[rows[:half], columns[half:]].all() and
+            self.free_map[rows[half:], columns[:half]].all() and
+            self.free_map[rows[half:], columns[half:]].all())
+
+    def connection(self, start, end):
+        """
+        Waypoints to go from start to end, ending with end, with 8
+        directions moves only: the diagonal move first or the straight move
+        first. None if both hit the scene.
+        """
+        (x1, y1), (x2, y2) = start, end
+        dx, dy = x2 - x1, y2 - y1
+        diagonal = min(abs(dx), abs(dy))
+        sx, sy = math.copysign(diagonal, dx), math.copysign(diagonal, dy)
+        for corner in ((x1 + sx, y1 + sy), (x2 - sx, y2 - sy)):
+            if self.is_free(start, corner) and self.is_free(corner, end):
+                if corner in (tuple(start), tuple(end)):
+                    return [tuple(end)]
+                return [corner, tuple(end)]
+
+    def neighbours(self, cell):
+        column, row = cell
+        for i, j, cost in NEIGHBOURS:
+            neighbour = column + i, row + j
+            if not self.is_walkable(neighbour):
+                continue
+            # Avoid cutting corners, the box would hit the obstacle.
+            diagonal = i and j
+            if diagonal and not (
+                    self.is_walkable((column + i, row)) and
+                    self.is_walkable((column, row + j))):
+                continue
+            yield neighbour, cost
+
+    def search(self, start, goal):
+        """
+        A* search between two walkable cells. Returns the list of cells
+        including both ends or None if the goal can't be reached.
+        """
+        key = start, goal
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        queue = [(0, 0, start)]
+        parents = {start: None}
+        costs = {start: 0}
+        while queue:
+            _, cost, cell = heapq.heappop(queue)
+            if cell == goal:
+                break
+            if cost > costs[cell]:
+                continue
+            for neighbour, step in self.neighbours(cell):
+                new_cost = cost + step
+                if new_cost >= costs.get(neighbour, math.inf):
+                    continue
+                costs[neighbour] = new_cost
+                parents[neighbour] = cell
+                priority = new_cost + octile(neighbour, goal)
+                heapq.heappush(queue, (priority, new_cost, neighbour))
+
+        cells = None
+        if goal in parents:
+            cells = [goal]
+            while parents[cells[-1]] is not None:
+                cells.append(parents[cells[-1]])
+            cells.reverse()
+
+        self.cache[key] = cells
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return cells
+
+    def find_path(self, origin, destination):
+        """
+        Return the waypoints to go from origin to
+        destination or None if there is no path.
+        """
+        for start in self.walkables_around(self.cell_at(origin)):
+            lead = self.connection(origin, self.cell_center(start))
+            if lead is not None:
+                break
+        else:
+            return
+        goals = list(self.walkables_around(self.cell_at(destination)))
+        if not goals:
+            return
+        for goal in goals:
+            tail = self.connection(self.cell_center(goal), destination)
+            if tail is not None:
+                break
+        else:
+            # The destination can't be reached without hitting the scene,
+            # the path stops at the center of the closest walkable cell.
+            goal, tail = goals[0], []
+        cells = self.search(start, goal)
+        if cells is None:
+            return
+        waypoints = lead[:-1]
+        waypoints += [self.cell_center(cell) for cell in simplify(cells)]
+        return waypoints + tail
+
+
+def octile(cell1, cell2):
+    dx = abs(cell1[0] - cell2[0])
+    dy = abs(cell1[1] - cell2[1])
+    return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+
+def simplify(cells):
+    """
+    Keep only the cells where the path changes of direction.
+    """
+    if len(cells) < 3:
+        return cells
+    result = [cells[0]]
+    for previous, cell, following in zip(cells, cells[1:], cells[2:]):
+        direction1 = cell[0] - previous[0], cell[1] - previous[1]
+        direction2 = following[0] - cell[0], following[1] - cell[1]
+        if direction1 != direction2:
+            result.append(cell)
+    result.append(cells[-1])
+    return result
@@ -0,0 +1,59 @@
+"""
+Prepare the next round on a worker thread while the last kill and the score
+screens are displayed: the deferred imports, the scene template, the
+animation data and the skins of its characters. The main thread takes the
+result when the round restarts. The worker is given a snapshot of the scene
+template taken on the main thread, never the scene being ticked.
+"""
+import importlib
+import threading
+from drunkparanoia.config import SKINS
+from drunkparanoia.io import load_skin
+
+
+# Modules imported on first use by the game, imported early by the worker.
+DEFERRED_IMPORTS = 'matplotlib.path',
+
+
+class Preloader:
+    def __init__(self, load_template, scene_path, template=None):
+        self.load_template = load_template
+        self.scene_path = scene_path
+        self.template = template
+        self.scene = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        try:
+            for module in DEFERRED_IMPORTS:
+                importlib.import_module(module)
+            scene = self.template
+            if scene is None:
+                scene = self.load_template(self.scene_path)
+            for character in scene.character_files:
+                skin = load_skin(scene.animation_data(character['file']))
+                # The original colors decode the sheets all the variations
+                # share.
+                skin.load(0)
+                if SKINS.WARM_VARIATIONS:
+                    skin.load_all()
+            self.scene = scene
+        except BaseException as error:
+            self.error = error
+
+    @property
+    def done(self):
+        return not self.thread.is_alive()
+
+    def take(self):
+        """
+        Wait for the worker if it is still running and return the template.
+        """
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.scene
@@ -0,0 +1,211 @@
+"""
+Lightweight frame profiler. Scopes are recorded into a ring buffer which can
+be summarized or dumped as a Chrome trace (chrome://tracing or
+https://ui.perfetto.dev). When the profiler is disabled, a scope costs a
+single global lookup.
+"""
+import sys
+import json
+import time
+import builtins
+import functools
+import threading
+from collections import deque
+from drunkparanoia.config import PROFILING
+
+
+_enabled = False
+_events = deque(maxlen=PROFILING.BUFFER_SIZE)
+# (module, cumulative ns, self ns) of the imports traced at startup.
+_imports = []
+_import_stack = []
+
+
+def enable(buffer_size=None):
+    global _enabled, _events
+    if buffer_size and buffer_size != _events.maxlen:
+        _events = deque(maxlen=buffer_size)
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def clear():
+    _events.clear()
+
+
+def record(name, start, end):
+    _events.append((name, start, end - start, threading.get_ident()))
+
+
+class _Scope:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *_):
+        record(self.name, self.start, time.perf_counter_ns())
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return
+
+    def __exit__(self, *_):
+        return
+
+
+_null_scope = _NullScope()
+
+
+def scope(name):
+    """
+    Context manager measuring the enclosed block:
+        with scope('render_scene.background'):
+            ...
+    """
+    if not _enabled:
+        return _null_scope
+    return _Scope(name)
+
+
+def profiled(name):
+    """
+    Decorator measuring every call of the decorated function.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, start, time.perf_counter_ns())
+        return wrapper
+    return decorator
+
+
+def trace_imports():
+    """
+    Record every module imported from now on by the calling thread, with
+    its cumulative and self import time.
+    """
+    original_import = builtins.__import__
+    thread = threading.get_ident()
+
+    def traced_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules or threading.get_ident() != thread:
+            return original_import(name, globals, locals, fromlist, level)
+        start = time.perf_counter_ns()
+        _import_stack.append(0)
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            end = time.perf_counter_ns()
+            children = _import_stack.pop()
+            if _import_stack:
+                _import_stack[-1] += end - start
+            record(f'import {name}', start, end)
+            _imports.append((name, end - start, end - start - children))
+
+    builtins.__import__ = traced_import
+
+
+def startup_report(time_to_first_frame):
+    """
+    Durations in ms of the startup steps (the scopes named "startup.*") and
+    of the traced imports, slowest first.
+    """
+    steps = [
+        (name, duration / 1e6) for name, _, duration, _ in list(_events)
+        if name.startswith('startup.')]
+    imports = sorted(_imports, key=lambda i: -i[1])
+    return {
+        'time_to_first_frame': time_to_first_frame * 1000,
+        'steps': steps,
+        'imports': [
+            (name, total / 1e6, own / 1e6) for name, total, own in imports]}
+
+
+def format_startup_report(report):
+    lines = [f'time to first frame: {report["time_to_first_frame"]:.1f} ms']
+    lines.append(f'\n{"step":<40}{"ms":>10}')
+    for name, duration in report['steps']:
+        lines.append(f'{name:<40}{duration:>10.2f}')
+    lines.append(f'\n{"import":<40}{"total ms":>10}{"self ms":>10}')
+    for name, total, own in report['imports'][:20]:
+        lines.append(f'{name:<40}{total:>10.2f}{own:>10.2f}')
+    return '\n'.join(lines)
+
+
+def chrome_trace():
+    events = [{
+        'name': name,
+        'ph': 'X',
+        'ts': start / 1000,
+        'dur': duration / 1000,
+        'pid': 0,
+        'tid': thread}
+        for name, start, duration, thread in list(_events)]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def dump_chrome_trace(filepath):
+    with open(filepath, 'w') as f:
+        json.dump(chrome_trace(), f)
+
+
+def percentile(values, ratio):
+    """
+    Nearest rank percentile of a sorted list.
+    """
+    index = max(0, min(len(values) - 1, round(ratio * len(values)) - 1))
+    return values[index]
+
+
+def summary():
+    durations = {}
+    for name, _, duration, _ in list(_events):
+        durations.setdefault(name, []).append(duration / 1e6)
+    result = {}
+    for name, values in durations.items():
+        values.sort()
+        result[name] = {
+            'count': len(values),
+            'total': sum(values),
+            'p50': percentile(values, .50),
+            'p95': percentile(values, .95),
+            'p99': percentile(values, .99),
+            'max': values[-1]}
+    return result
+
+
+def format_summary(data=None):
+    data = data or summary()
+    header = (
+        f'{"scope":<32}{"count":>8}{"total ms":>11}'
+        f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}')
+    lines = [header, '-' * len(header)]
+    items = sorted(data.items(), key=lambda item: -item[1]['total'])
+    for name, stats in items:
+        lines.append(
+            f'{name:<32}{stats["count"]:>8}{stats["total"]:>11.2f}'
+            f'{stats["p50"]:>9.3f}{stats["p95"]:>9.3f}{stats["p99"]:>9.3f}'
+            f'{stats["max"]:>9.3f}')
+    return '\n'.join(lines)
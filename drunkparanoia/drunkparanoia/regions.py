@@ -0,0 +1,78 @@
+"""
+Per pixel lookup rasters for the scene rectangles (stairs, interaction zones,
+target origins). A LabelMap tells which rectangles contain a point with a
+single array index.
+
+The rectangles are closed: point_in_rectangle includes their right and
+bottom edges. To stay exact with floating coordinates, the raster has two
+cells per pixel: cell 2 * n stands for the coordinate n exactly and cell
+2 * n + 1 for the open interval ]n, n + 1[.
+"""
+import math
+import numpy
+from drunkparanoia.coordinates import point_in_rectangle
+
+
+class LabelMap:
+    def __init__(self, rects, baked=None):
+        self.rects = [list(r) for r in rects]
+        # Each label is a tuple of the indexes of the rectangles containing
+        # the cell, in the rectangles order. Label 0 is the empty tuple.
+        self.combinations = [()]
+        self.exact = all(
+            float(n).is_integer() for rect in self.rects for n in rect)
+        if not self.rects or not self.exact:
+            self.labels = None
+            return
+
+        self.left = int(min(r[0] for r in self.rects))
+        self.top = int(min(r[1] for r in self.rects))
+        right = int(max(r[0] + r[2] for r in self.rects))
+        bottom = int(max(r[1] + r[3] for r in self.rects))
+        shape = 2 * (bottom - self.top) + 1, 2 * (right - self.left) + 1
+        if baked is not None:
+            # Labels and combinations restored from a compiled scene.
+            self.labels, combinations = baked
+            self.combinations = [tuple(c) for c in combinations]
+            return
+        self.labels = numpy.zeros(shape, dtype=numpy.int16)
+
+        indexes = {(): 0}
+        for i, (x, y, width, height) in enumerate(self.rects):
+            top = 2 * (int(y) - self.top)
+            bottom = 2 * (int(y + height) - self.top)
+            left = 2 * (int(x) - self.left)
+            right = 2 * (int(x + width) - self.left)
+            region = slice(top, bottom + 1), slice(left, right + 1)
+            labels = self.labels[region]
+            for label in numpy.unique(labels):
+                combination = self.combinations[label] + (i,)
+                if combination not in indexes:
+                    indexes[combination] = len(self.combinations)
+                    self.combinations.append(combination)
+                labels[labels == label] = indexes[combination]
+
+    def all(self, point):
+        """
+        Indexes of all the rectangles containing the point.
+        """
+        if self.labels is None:
+            return tuple(
+                i for i, rect in enumerate(self.rects)
+                if point_in_rectangle(point, *rect))
+        x, y = point
+        floor_x = math.floor(x)
+        floor_y = math.floor(y)
+        column = 2 * (floor_x - self.left) + (x != floor_x)
+        row = 2 * (floor_y - self.top) + (y != floor_y)
+        height, width = self.labels.shape
+        if not (0 <= column < width and 0 <= row < height):
+            return ()
+        return self.combinations[self.labels.item(row, column)]
+
+    def first(self, point):
+        """
+        Index of the first rectangle containing the point or None.
+        """
+        indexes = self.all(point)
+        return indexes[0] if indexes else None
@@ -1,10 +1,9 @@
-import numpy
-import math
 import pygame
-from drunkparanoia.io import get_image
+from drunkparanoia.io import get_image, image_handle
 from drunkparanoia.config import LOOP_STATUSES
 from drunkparanoia.scene import column_to_group, get_score_data
 from drunkparanoia.character import Character
+from drunkparanoia.profiler import profiled, scope
 
 
 def render_game(screen, loop):
@@ -25,7 +24,25 @@ COL_COUNT = 7
 ROW_COUNT = 4
 
 
+# Score tables rendered by screen size: (scores, surface).
+_score_tables = {}
+
+
 def render_score(screen, loop):
+    """
+    The table is only rendered again when the scores change.
+    """
+    size = screen.get_size()
+    scores = repr(loop.scores)
+    cached = _score_tables.get(size)
+    if cached is None or cached[0] != scores:
+        table = pygame.Surface(size).convert()
+        draw_score_table(table, loop.scores)
+        _score_tables[size] = cached = scores, table
+    screen.blit(cached[1], (0, 0))
+
+
+def draw_score_table(screen, scores):
     screen.fill((0, 0, 0))
     for row in range(ROW_COUNT):
         player = f'player {row + 1}'
@@ -34,7 +51,7 @@ def render_score(screen, loop):
         for col in range(COL_COUNT):
             rect = get_cell_rect(screen, row, col)
             pygame.draw.rect(screen, (30, 30, 30), rect, width=1)
-            data = get_score_data(loop.scores, row, col)
+            data = get_score_data(scores, row, col)
             draw_score_data(screen, rect, data)
 
     headers = 'p1', 'p2', 'p3', 'p4', 'tot', 'npc', 'win'
@@ -95,19 +112,35 @@ def render_last_kill(screen, loop):
         temp.fill((0, 0, 0))
         temp.set_alpha(180)
         screen.blit(temp, (0, 0))
+    blits = []
     for player in loop.scene.players:
-        render_element(screen, player.character)
+        blits.append(element_blit(player.character))
         x, y = player.character.coordinates.position
         y += 15
-        draw_text(screen, f'player {player.index + 1}', (x, y))
+        blits.append(text_blit(f'player {player.index + 1}', (x, y)))
+    screen.blits(blits, doreturn=False)
 
 
 def draw_text(surface, text, pos, color=None):
+    surface.blit(*text_blit(text, pos, color))
+
+
+def text_blit(text, pos, color=None):
     color = color or (255, 255, 255)
     font = pygame.font.SysFont('Consolas', 15)
     text = font.render(text, True, color)
-    text_rect = text.get_rect(center=pos)
-    surface.blit(text, text_rect)
+    return text, text.get_rect(center=pos)
+
+
+def render_loading(screen, done, total):
+    screen.fill((0, 0, 0))
+    width, height = screen.get_size()
+    draw_text(screen, 'loading', (width // 2, height // 2 - 20))
+    rect = pygame.Rect(0, 0, width // 2, 8)
+    rect.center = width // 2, height // 2 + 10
+    pygame.draw.rect(screen, (200, 200, 200), rect, width=1)
+    rect.width = round(rect.width * done / max(total, 1))
+    pygame.draw.rect(screen, (200, 200, 200), rect)
 
 
 def render_dispatching(screen, loop):
@@ -117,9 +150,8 @@ def render_dispatching(screen, loop):
     screen.blit(temp, (0, 0))
     elements = [p for p in loop.scene.props if p.visible_at_dispatch]
     elements += loop.scene.characters
-    for element in sorted(elements, key=lambda elt: elt.switch):
-        render_element(screen, element)
-    gamepad_image = get_image('resources/ui/gamepad.png')
+    blits = element_blits(elements)
+    gamepad_image = get_image(image_handle('resources/ui/gamepad.png'))
     offset_x = gamepad_image.get_size()[0] / 2
     offset_y = gamepad_image.get_size()[1] / 2
     column_counts = [0, 0, 0, 0, 0]
@@ -134,11 +166,12 @@ def render_dispatching(screen, loop):
             position = group['assigned'][row]
         x = position[0] - offset_x
         y = position[1] - offset_y
-        screen.blit(gamepad_image, (x, y))
+        blits.append((gamepad_image, (x, y)))
         x = position[0] + gamepad_image.get_size()[0]
         y = position[1]
-        draw_text(screen, str(i + 1), (x, y))
+        blits.append(text_blit(str(i + 1), (x, y)))
         column_counts[column] += 1
+    screen.blits(blits, doreturn=False)
 
 
 def render_no_player(screen):
@@ -150,35 +183,47 @@ def render_no_player(screen):
     screen.blit(text, text_rect)
 
 
+@profiled('render_scene')
 def render_scene(screen, scene):
     # Background Color.
     if scene.black_screen_countdown or scene.white_screen_countdown:
-        render_death_screen(screen, scene)
+        with scope('render_scene.death_screen'):
+            render_death_screen(screen, scene)
         return
-    # Background.
-    for background in scene.backgrounds:
-        screen.blit(get_image(background.image), background.position)
-    duel_surface = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+    # Background. The decals are part of it: the active duel lines are
+    # drawn over them.
+    with scope('render_scene.background'):
+        if scene.decals:
+            screen.blit(scene.decals.image(screen.get_size()), (0, 0))
+        else:
+            for background in scene.backgrounds:
+                screen.blit(get_image(background.image), background.position)
     # Duel.
-    duel_surface.set_alpha(50)
-    for character in scene.characters:
-        if character.duel_target:
-            pos1 = character.coordinates.position
-            pos2 = character.duel_target.coordinates.position
-            pygame.draw.line(duel_surface, (255, 255, 0), pos1, pos2, 6)
-    screen.blit(duel_surface, (0, 0))
-    # Background.
-    elements = sorted(scene.elements, key=lambda elt: elt.switch)
-    for element in elements:
-        render_element(screen, element)
+    with scope('render_scene.duels'):
+        lines = {
+            (character, character.duel_target): (
+                character.coordinates.position,
+                character.duel_target.coordinates.position)
+            for character in scene.characters if character.duel_target}
+        scene.duel_layer.update(lines, screen.get_size())
+        scene.duel_layer.render(screen)
+    # Elements.
+    with scope('render_scene.collect'):
+        blits = element_blits(scene.elements)
+    with scope('render_scene.elements'):
+        screen.blits(blits, doreturn=False)
     # Possible duel.
-    duel_surface = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
-    duel_surface.set_alpha(50)
-    for character1, character2 in scene.possible_duels:
-        draw_possible_duel(duel_surface, character1, character2)
-    screen.blit(duel_surface, (0, 0))
+    with scope('render_scene.possible_duels'):
+        lines = {
+            (character1, character2): (
+                (character1.coordinates.x, character1.coordinates.y - 30),
+                (character2.coordinates.x, character2.coordinates.y - 30))
+            for character1, character2 in scene.possible_duels}
+        scene.possible_duel_layer.update(lines, screen.get_size())
+        scene.possible_duel_layer.render(screen)
     # Scores.
-    render_players_ol_score(screen, scene)
+    with scope('render_scene.hud'):
+        render_players_ol_score(screen, scene)
     # for rect in scene.no_go_zones:
     #     draw_rect(screen, rect, 125)
     # for interaction_zone in scene.interaction_zones:
@@ -186,16 +231,15 @@ def render_scene(screen, scene):
 
 
 def render_players_ol_score(screen, scene):
-    image = get_image(scene.score_ol.image)
-    screen.blit(image, scene.score_ol.render_position)
+    images = [(scene.score_ol.image, scene.score_ol.render_position)]
     for player in scene.players:
-        image = get_image(scene.life_image(player.index, player.life))
-        position = scene.life_positions[player.index]
-        screen.blit(image, position)
+        image = scene.life_image(player.index, player.life)
+        images.append((image, scene.life_positions[player.index]))
         on = player.bullet_cooldown == 0
-        image = get_image(scene.bullet_image(player.index, on))
-        position = scene.bullet_positions[player.index]
-        screen.blit(image, position)
+        image = scene.bullet_image(player.index, on)
+        images.append((image, scene.bullet_positions[player.index]))
+    scene.hud.update(images)
+    scene.hud.render(screen)
 
 
 def render_death_screen(screen, scene):
@@ -209,15 +253,21 @@ def render_death_screen(screen, scene):
         render_element(screen, character)
 
 
-def draw_possible_duel(screen, char1, char2):
-    p1 = char1.coordinates.x, char1.coordinates.y - 30
-    p2 = char2.coordinates.x, char2.coordinates.y - 30
-    draw_dashed_line(screen, 'white', p1, p2)
+def element_blits(elements):
+    """
+    (image, position) pairs of the elements in depth order, to submit in a
+    single Surface.blits call.
+    """
+    elements = sorted(elements, key=lambda elt: elt.switch)
+    return [element_blit(element) for element in elements]
+
+
+def element_blit(element):
+    return get_image(element.image), element.render_position
 
 
 def render_element(screen, element):
-    img = element.image
-    screen.blit(get_image(img), element.render_position)
+    screen.blit(*element_blit(element))
     # if isinstance(element, Character):
     #     if element.path:
     #         last = None
@@ -238,37 +288,3 @@ def draw_rect(surface, box, alpha=255):
     temp.set_alpha(alpha)
     surface.blit(temp, (x, y))
 
-
-def draw_dashed_line(surf, color, start_pos, end_pos, width=1, dash_length=4):
-    """
-    https://codereview.stackexchange.com/questions/70143/drawing-a-dashed-line-with-pygame
-    """
-    x1, y1 = (int(n) for n in start_pos)
-    x2, y2 = (int(n) for n in end_pos)
-    dl = dash_length
-
-    if x1 == x2:
-        ycoords = list(range(y1, y2, dl if y1 < y2 else -dl))
-        xcoords = [x1] * len(ycoords)
-    elif y1 == y2:
-        try:
-            xcoords = list(range(x1, x2, dl if x1 < x2 else -dl))
-            ycoords = [y1] * len(xcoords)
-        except TypeError as e:
-            raise TypeError from e
-    else:
-        a = abs(x2 - x1)
-        b = abs(y2 - y1)
-        c = round(math.sqrt(a**2 + b**2))
-        dx = dl * a / c
-        dy = dl * b / c
-
-        xcoords = list(numpy.arange(x1, x2, dx if x1 < x2 else -dx))
-        ycoords = list(numpy.arange(y1, y2, dy if y1 < y2 else -dy))
-
-    next_coords = list(zip(xcoords[1::2], ycoords[1::2]))
-    last_coords = list(zip(xcoords[::2], ycoords[::2]))
-    for (x1, y1), (x2, y2) in zip(next_coords, last_coords):
-        start = (round(x1), round(y1))
-        end = (round(x2), round(y2))
-        pygame.draw.line(surf, color, start, end, width)
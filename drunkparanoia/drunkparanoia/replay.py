@@ -0,0 +1,169 @@
+"""
+Record a session as its random seed and the state of the joysticks at every
+tick, and play it back. The simulation only depends on them, a replay
+reproduces the session tick for tick without display nor real joysticks.
+"""
+import json
+import zlib
+import random
+import pygame
+from drunkparanoia.config import REPLAY
+
+
+class ReplayJoystick:
+    """
+    Joystick answering from a state recorded at each tick. The state is
+    stored as a list of [tick, state] for the ticks where it changed.
+    """
+
+    def __init__(self, name, changes=None):
+        self.name = name
+        self.changes = changes or []
+        self.state = None
+        self.change_index = 0
+
+    def seek(self, tick):
+        # Ticks only go forward.
+        while (
+                self.change_index < len(self.changes) and
+                self.changes[self.change_index][0] <= tick):
+            self.state = self.changes[self.change_index][1]
+            self.change_index += 1
+
+    def get_name(self):
+        return self.name
+
+    def get_button(self, index):
+        return self.state[0][index]
+
+    def get_axis(self, index):
+        return self.state[1][index]
+
+    def get_hat(self, index):
+        return tuple(self.state[2][index])
+
+
+class RecordingJoystick(ReplayJoystick):
+    """
+    Freeze the state of a real joystick once per tick and record it. The
+    game reads the frozen state, so the replay reads exactly the same.
+    """
+
+    def __init__(self, joystick):
+        super().__init__(joystick.get_name())
+        self.joystick = joystick
+
+    def capture(self, tick):
+        joystick = self.joystick
+        state = [
+            [joystick.get_button(i) for i in range(joystick.get_numbuttons())],
+            [joystick.get_axis(i) for i in range(joystick.get_numaxes())],
+            [list(joystick.get_hat(i)) for i in range(joystick.get_numhats())]]
+        if state != self.state:
+            self.changes.append([tick, state])
+            self.state = state
+
+
+class NullClock:
+    def tick(self, framerate=0):
+        return 0
+
+
+def state_checksum(loop):
+    characters = loop.scene.characters if loop.scene else []
+    state = [(
+        round(c.coordinates.x, 6), round(c.coordinates.y, 6), c.status,
+        c.direction, c.spritesheet.animation, c.spritesheet.index)
+        for c in characters]
+    return zlib.crc32(repr((loop.status, state)).encode())
+
+
+class Recorder:
+    """
+    Drive a game loop and record its inputs:
+        recorder = Recorder(loop)
+        loop.start_scene()
+        while not loop.done:
+            next(recorder)
+    """
+
+    def __init__(self, loop, seed=None):
+        self.loop = loop
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        random.seed(self.seed)
+        self.joysticks = [RecordingJoystick(j) for j in loop.joysticks]
+        loop.joysticks = self.joysticks
+        self.tick = 0
+        self.checksums = {}
+
+    def __next__(self):
+        # Update the joysticks state before it is frozen for the tick.
+        pygame.event.pump()
+        for joystick in self.joysticks:
+            joystick.capture(self.tick)
+        next(self.loop)
+        if self.loop.done:
+            return
+        if self.tick % REPLAY.CHECKSUM_INTERVAL == 0:
+            self.checksums[self.tick] = state_checksum(self.loop)
+        self.tick += 1
+
+    def save(self, filepath):
+        data = {
+            'version': REPLAY.VERSION,
+            'seed': self.seed,
+            'scene': self.loop.scene_path,
+            'ticks': self.tick,
+            'joysticks': [
+                {'name': j.name, 'changes': j.changes}
+                for j in self.joysticks],
+            'checksums': self.checksums}
+        with open(filepath, 'w') as f:
+            json.dump(data, f)
+
+
+class Replay:
+    """
+    Play a recorded session back, tick by tick:
+        replay = Replay(load_replay(filepath))
+        for tick in range(replay.ticks):
+            next(replay)
+            render_game(screen, replay.loop)
+    """
+
+    def __init__(self, data):
+        # Imported here, the scene module pulls the whole game.
+        from drunkparanoia.scene import GameLoop
+        if data['version'] != REPLAY.VERSION:
+            raise ValueError(
+                f'Replay version {data["version"]} is not supported, '
+                f'expected {REPLAY.VERSION}.')
+        self.ticks = data['ticks']
+        self.checksums = {
+            int(tick): checksum for tick, checksum in
+            data['checksums'].items()}
+        self.tick = 0
+        random.seed(data['seed'])
+        self.loop = GameLoop()
+        self.loop.clock = NullClock()
+        self.loop.joysticks = [
+            ReplayJoystick(j['name'], j['changes'])
+            for j in data['joysticks']]
+        self.loop.set_scene(data['scene'])
+        self.loop.start_scene()
+
+    def __next__(self):
+        if self.tick >= self.ticks:
+            raise StopIteration
+        for joystick in self.loop.joysticks:
+            joystick.seek(self.tick)
+        next(self.loop)
+        expected = self.checksums.get(self.tick)
+        if expected is not None and state_checksum(self.loop) != expected:
+            raise RuntimeError(f'Replay desynchronized at tick {self.tick}.')
+        self.tick += 1
+
+
+def load_replay(filepath):
+    with open(filepath, 'r') as f:
+        return json.load(f)
@@ -1,22 +1,39 @@
+import os
 import sys
-import json
+import numpy
 import random
 import pygame
 import itertools
-from copy import deepcopy
+from copy import copy, deepcopy
 
 from drunkparanoia.background import Prop, Background, Overlay
 from drunkparanoia.character import Character, Player, Npc
+from drunkparanoia.collision import CollisionMap
 from drunkparanoia.coordinates import (
     box_hit_box, point_in_rectangle, box_hit_polygon, path_cross_polygon,
     path_cross_rect)
 from drunkparanoia.config import (
-    DIRECTIONS, GAMEROOT, COUNTDOWNS, LOOP_STATUSES)
+    DECALS, DIRECTIONS, GAMEROOT, COUNTDOWNS, LOOP_STATUSES, NAVIGATION,
+    SCENE_PACKAGE)
+from drunkparanoia.destinations import DestinationSampler
 from drunkparanoia.duel import find_possible_duels
 from drunkparanoia.io import (
-    load_image, load_data, quit_event, list_joysticks, image_mirror)
+    load_image, load_data, quit_event, list_joysticks, image_mirror,
+    image_handle, store_image)
 from drunkparanoia.joystick import get_current_commands
+from drunkparanoia.layers import DecalLayer, DuelLayer, HudLayer
+from drunkparanoia.package import read_package, write_package
+from drunkparanoia.pathfinding import NavigationGrid
+from drunkparanoia.preload import Preloader
+from drunkparanoia.profiler import profiled
+from drunkparanoia.regions import LabelMap
+from drunkparanoia.scheduler import Scheduler
 from drunkparanoia.sprite import SpriteSheet
+from drunkparanoia.table import CharacterTable
+
+
+# Scene attributes holding the baked lookup rasters.
+REGION_MAPS = 'stair_map', 'interaction_map', 'attraction_map', 'target_map'
 
 
 VIRGIN_SCORES = {
@@ -69,10 +86,48 @@ def get_score_data(scores, row, col):
 
 
 def load_scene(filename):
+    scene = load_template(filename)
+    scene.reset()
+    return scene
+
+
+def load_template(filename):
+    """
+    Load the static part of the scene: the compiled package when it is up
+    to date, otherwise the json scene baked on the fly. The round state is
+    set by Scene.reset.
+    """
+    path = package_path(filename)
+    if os.path.exists(f'{GAMEROOT}/{path}'):
+        try:
+            manifest, arrays = read_package(f'{GAMEROOT}/{path}')
+        except ValueError as error:
+            print(f'Ignore scene package: {error}')
+        else:
+            if package_is_fresh(path, manifest):
+                return restore_scene(manifest, arrays)
+    return bake_scene(filename)
+
+
+def parse_scene(filename):
+    scene = bake_scene(filename)
+    scene.reset()
+    return scene
+
+
+def bake_scene(filename):
+    data = load_data(filename)
+    scene = create_scene(data)
+    scene.bake_collisions()
+    scene.bake_regions()
+    for box in character_boxes(data):
+        scene.free_map(box)
+        scene.navigation_grid(box)
+        scene.destination_sampler(box)
+    return scene
 
-    filepath = f'{GAMEROOT}/{filename}'
-    with open(filepath, 'r') as f:
-        data = json.load(f)
+
+def create_scene(data):
     scene = Scene()
     scene.character_number = data['character_number']
     scene.name = data['name']
@@ -83,10 +138,8 @@ def load_scene(filename):
     scene.targets = data['targets']
     scene.fences = data['fences']
     scene.startups = data['startups']
-    popspots = data['popspots'][:]
-    random.shuffle(popspots)
-    scene.popspot_generator = itertools.cycle(popspots)
-    scene.character_generator = itertools.cycle(data['characters'])
+    scene.popspots = data['popspots']
+    scene.character_files = data['characters']
 
     position = data['score']['ol']['position']
     image = load_image(data['score']['ol']['file'], key_color=(0, 255, 0))
@@ -112,7 +165,7 @@ def load_scene(filename):
 
     for ol in data['overlays']:
         image = load_image(ol['file'], (0, 255, 0))
-        scene.overlays.append(Overlay(image, ol['position'], ol['y']))
+        scene.static_overlays.append(Overlay(image, ol['position'], ol['y']))
 
     for prop in data['props']:
         image = load_image(prop['file'])
@@ -130,11 +183,168 @@ def load_scene(filename):
     return scene
 
 
+def character_boxes(data):
+    boxes = {}
+    for character in data['characters']:
+        box = load_data(character['file'])['box']
+        boxes.setdefault(tuple(box), box)
+    return list(boxes.values())
+
+
+def scene_images(data):
+    """
+    Files and color keys of every image the scene may load.
+    """
+    green = 0, 255, 0
+    images = [(data['score']['ol']['file'], green)]
+    images += [(bg['file'], None) for bg in data['backgrounds']]
+    for i in range(1, 5):
+        score = data['score'][f'player{i}']
+        images += [(score['life'][f'file{j}'], None) for j in range(1, 5)]
+        images += [(score['bullet'][key], None) for key in ('on', 'off')]
+    images += [(ol['file'], green) for ol in data['overlays']]
+    images += [(prop['file'], None) for prop in data['props']]
+    images += [
+        (vfx['file'], None) for vfx in data['vfx']
+        if vfx.get('type') == 'static']
+    unique = {}
+    for filename, key_color in images:
+        unique.setdefault(filename, key_color)
+    return list(unique.items())
+
+
+def package_path(filename):
+    return os.path.splitext(filename)[0] + SCENE_PACKAGE.EXTENSION
+
+
+def package_is_fresh(path, manifest):
+    navigation = [list(NAVIGATION.SIZE), NAVIGATION.CELL_SIZE]
+    if manifest['navigation'] != navigation:
+        return False
+    modified = os.path.getmtime(f'{GAMEROOT}/{path}')
+    for source in manifest['sources']:
+        source = f'{GAMEROOT}/{source}'
+        if not os.path.exists(source) or os.path.getmtime(source) > modified:
+            return False
+    return True
+
+
+def compile_scene(filename, output=None):
+    """
+    Compile the scene json and its assets into a single package: the pixel
+    data of the images in the display format, the static layers sorted by
+    render order and the baked collisions, regions, navigation grids and
+    destinations.
+    """
+    data = load_data(filename)
+    # Pre-sort the static layers. The sort is stable, the render order of
+    # the elements with the same depth is unchanged.
+    data['props'] = sorted(data['props'], key=lambda p: p['position'][1])
+    data['overlays'] = sorted(data['overlays'], key=lambda o: o['y'])
+    scene = create_scene(data)
+    scene.bake_collisions()
+    scene.bake_regions()
+
+    arrays = {}
+    images = []
+    for i, (image_file, key_color) in enumerate(scene_images(data)):
+        # The source pixels: the loaded images may be normalized.
+        image = pygame.image.load(f'{GAMEROOT}/{image_file}').convert_alpha()
+        width, height = image.get_size()
+        pixels = pygame.image.tobytes(image, 'BGRA')
+        arrays[f'images/{i}'] = numpy.frombuffer(
+            pixels, dtype=numpy.uint8).reshape(height, width, 4)
+        images.append({
+            'file': image_file,
+            'key_color': key_color,
+            'size': [width, height]})
+
+    for name, array in scene.collision_map.baked_arrays().items():
+        arrays[f'collision/{name}'] = array
+
+    regions = {}
+    for name in REGION_MAPS:
+        label_map = getattr(scene, name)
+        if label_map.labels is None:
+            continue
+        labels = label_map.labels
+        if len(label_map.combinations) <= 256:
+            labels = labels.astype(numpy.uint8)
+        arrays[f'regions/{name}'] = labels
+        regions[name] = label_map.combinations
+
+    boxes = []
+    for i, box in enumerate(character_boxes(data)):
+        grid = scene.navigation_grid(box)
+        arrays[f'navigation/{i}'] = numpy.array(grid.walkable, dtype=bool)
+        arrays[f'free/{i}'] = scene.free_map(box)
+        sampler = scene.destination_sampler(box)
+        destinations = []
+        for j, (rect, positions) in enumerate(
+                sampler.free_positions.items()):
+            arrays[f'destinations/{i}/{j}'] = positions.astype(numpy.int32)
+            destinations.append(list(rect))
+        boxes.append({'box': box, 'destinations': destinations})
+
+    sources = [filename] + [image['file'] for image in images]
+    sources += [c['file'] for c in data['characters']]
+    manifest = {
+        'scene': data,
+        'sources': sorted(set(sources)),
+        'navigation': [list(NAVIGATION.SIZE), NAVIGATION.CELL_SIZE],
+        'images': images,
+        'regions': regions,
+        'boxes': boxes}
+    output = output or f'{GAMEROOT}/{package_path(filename)}'
+    write_package(output, manifest, arrays)
+    return output
+
+
+def load_scene_package(filepath):
+    scene = restore_scene(*read_package(filepath))
+    scene.reset()
+    return scene
+
+
+def restore_scene(manifest, arrays):
+    for i, image in enumerate(manifest['images']):
+        if image_handle(image['file']) is not None:
+            continue
+        pixels = arrays[f'images/{i}']
+        surface = pygame.image.frombuffer(pixels, image['size'], 'BGRA')
+        surface = surface.convert_alpha()
+        store_image(image['file'], surface, image['key_color'])
+
+    scene = create_scene(manifest['scene'])
+    baked = {
+        name.split('/')[1]: array for name, array in arrays.items()
+        if name.startswith('collision/')}
+    scene.bake_collisions(baked)
+    baked = {
+        name: (arrays[f'regions/{name}'], combinations)
+        for name, combinations in manifest['regions'].items()}
+    scene.bake_regions(baked)
+
+    for i, entry in enumerate(manifest['boxes']):
+        box = entry['box']
+        scene.free_maps[tuple(box)] = arrays[f'free/{i}']
+        walkable = arrays[f'navigation/{i}'].tolist()
+        grid = NavigationGrid(scene, box, walkable=walkable)
+        scene.navigation_grids[tuple(box)] = grid
+        free_positions = {
+            tuple(rect): arrays[f'destinations/{i}/{j}']
+            for j, rect in enumerate(entry['destinations'])}
+        sampler = DestinationSampler(scene, box, free_positions)
+        scene.destination_samplers[tuple(box)] = sampler
+    return scene
+
+
 class GameLoop:
     def __init__(self):
         self.status = LOOP_STATUSES.AWAITING
         self.scene_path = None
         self.scene = None
+        self.preloader = None
         self.dispatcher = None
         self.done = False
         self.clock = pygame.time.Clock()
@@ -142,13 +352,24 @@ class GameLoop:
         self.joysticks = list_joysticks()
 
     def set_scene(self, path):
+        if path != self.scene_path:
+            self.scene = None
+            self.preloader = None
         self.scene_path = path
 
     def start_scene(self):
-        self.scene = load_scene(self.scene_path)
+        # The static part of the scene is loaded once and reused as template
+        # for the next rounds.
+        if self.preloader is not None:
+            self.scene = self.preloader.take()
+            self.preloader = None
+        elif self.scene is None:
+            self.scene = load_template(self.scene_path)
+        self.scene.reset()
         self.status = LOOP_STATUSES.DISPATCHING
         self.dispatcher = PlayerDispatcher(self.scene, self.joysticks)
 
+    @profiled('GameLoop.__next__')
     def __next__(self):
         self.done = self.done or quit_event()
         if self.done:
@@ -160,6 +381,7 @@ class GameLoop:
                 self.clock.tick(60)
                 if self.scene.ultime_showdown:
                     self.status = LOOP_STATUSES.LAST_KILL
+                    self.preload()
 
             case LOOP_STATUSES.DISPATCHING:
                 next(self.dispatcher)
@@ -179,6 +401,15 @@ class GameLoop:
                         self.start_scene()
                 self.clock.tick(10)
 
+    def preload(self):
+        """
+        Prepare the next round on a worker thread during the last kill and
+        the score screens.
+        """
+        template = self.scene.template()
+        self.preloader = Preloader(load_template, self.scene_path, template)
+        self.preloader.start()
+
     def show_score(self):
         self.status = LOOP_STATUSES.SCORE
         for player in self.scene.players:
@@ -297,12 +528,11 @@ class Scene:
         self.life_positions = []
         self.bullet_positions = []
         self.bullet_images = []
-        self.characters = []
         self.props = []
-        self.overlays = []
-        self.players = []
-        self.npcs = []
-        self.possible_duels = []
+        self.static_overlays = []
+        self.popspots = []
+        self.character_files = []
+        self.animation_datas = {}
         self.no_go_zones = []
         self.interaction_zones = []
         self.backgrounds = []
@@ -310,12 +540,54 @@ class Scene:
         self.stairs = []
         self.targets = []
         self.fences = []
-
+        self.collision_map = None
+        self.stair_map = None
+        self.interaction_map = None
+        self.attraction_map = None
+        self.target_map = None
+        self.navigation_grids = {}
+        self.destination_samplers = {}
+        self.free_maps = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Rebuild the round state: characters, players, npcs, vfx overlays,
+        render layers and countdowns. The static part of the scene, its
+        images and its baked data are kept as is.
+        """
+        self.characters = []
+        self.table = CharacterTable()
+        self.timers = Scheduler()
+        self.overlays = self.static_overlays[:]
+        self.decals = DecalLayer(self.backgrounds)
+        self.duel_layer = DuelLayer((255, 255, 0), 6, 50)
+        self.possible_duel_layer = DuelLayer('white', 1, 50, dashed=True)
+        self.hud = HudLayer()
+        self.players = []
+        self.npcs = []
+        self.sleeping = set()
+        self.possible_duels = []
         self.black_screen_countdown = 0
         self.white_screen_countdown = 0
         self.killer = None
-        self.popspot_generator = None
-        self.character_generator = None
+        popspots = self.popspots[:]
+        random.shuffle(popspots)
+        self.popspot_generator = itertools.cycle(popspots)
+        self.character_generator = itertools.cycle(self.character_files)
+
+    def template(self):
+        """
+        Snapshot of the static part of the scene for the next round. The
+        images and the baked data are shared, the caches the template may
+        fill are copied and the round state is set by Scene.reset.
+        """
+        template = copy(self)
+        template.animation_datas = dict(self.animation_datas)
+        template.navigation_grids = dict(self.navigation_grids)
+        template.destination_samplers = dict(self.destination_samplers)
+        template.free_maps = dict(self.free_maps)
+        return template
 
     def create_vfx(self, name, position, flipped=True):
         for vfx in self.vfx:
@@ -323,7 +595,10 @@ class Scene:
                 continue
             image = load_image(vfx['file'])
             if flipped:
-                image = image_mirror(image, horizontal=True)
+                image = image_mirror(image)
+            if name in DECALS.NAMES:
+                self.decals.add(image, position)
+                return
             self.overlays.append(Overlay(image, position, vfx['y']))
             return
 
@@ -342,13 +617,20 @@ class Scene:
         position = position or next(self.popspot_generator)
         direction = direction or random.choice(DIRECTIONS.ALL)
         char = next(self.character_generator)
-        spritesheet = SpriteSheet(load_data(char['file']))
+        spritesheet = SpriteSheet(self.animation_data(char['file']))
         variation = random.choice(list(range(spritesheet.variation_count)))
+        # Build the color variation at spawn rather than on first render.
+        spritesheet.images.load(variation)
         char = Character(position, spritesheet, variation, self)
         char.direction = direction
         self.characters.append(char)
         return char
 
+    def animation_data(self, filename):
+        if filename not in self.animation_datas:
+            self.animation_datas[filename] = load_data(filename)
+        return self.animation_datas[filename]
+
     def life_image(self, player_n, score):
         index = int(round((score / COUNTDOWNS.MAX_LIFE) * 3))
         return self.life_images[player_n][index]
@@ -360,30 +642,73 @@ class Scene:
     def elements(self):
         return self.characters + self.props + self.overlays
 
-    def inclination_at(self, point):
-        for stair in self.stairs:
-            if point_in_rectangle(point, *stair['zone']):
-                return stair['inclination']
-        return 0
-
-    def choice_destination_from(self, point):
-        targets = [
-            t for t in self.targets
-            if point_in_rectangle(point, *t['origin'])]
-
-        if not targets:
-            return
+    def navigation_grid(self, box):
+        key = tuple(box)
+        if key not in self.navigation_grids:
+            self.navigation_grids[key] = NavigationGrid(self, box)
+        return self.navigation_grids[key]
+
+    def bake_regions(self, baked=None):
+        baked = baked or {}
+        rects = {
+            'stair_map': [stair['zone'] for stair in self.stairs],
+            'interaction_map': [z.zone for z in self.interaction_zones],
+            'attraction_map': [z.attraction for z in self.interaction_zones],
+            'target_map': [target['origin'] for target in self.targets]}
+        for name in REGION_MAPS:
+            setattr(self, name, LabelMap(rects[name], baked.get(name)))
 
-        destinations = [
-            d for t in targets
-            for _ in range(t['weight'])
-            for d in t['destinations']]
-
-        destination = random.choice(destinations)
-        x = random.randrange(destination[0], destination[0] + destination[2])
-        y = random.randrange(destination[1], destination[1] + destination[3])
-
-        return x, y
+    def inclination_at(self, point):
+        index = self.stair_map.first(point)
+        if index is None:
+            return 0
+        return self.stairs[index]['inclination']
+
+    def interaction_zone_at(self, point):
+        index = self.interaction_map.first(point)
+        if index is not None:
+            return self.interaction_zones[index]
+
+    def attraction_zone_at(self, point):
+        index = self.attraction_map.first(point)
+        if index is not None:
+            return self.interaction_zones[index]
+
+    def bake_collisions(self, baked=None):
+        rects = [p.screen_box for p in self.props if p.screen_box]
+        rects += self.no_go_zones
+        self.collision_map = CollisionMap(rects, self.walls, baked=baked)
+
+    def collision_mask(self, rect, box, exact=True):
+        """
+        Return a boolean array [row, column] telling for every integer
+        position of the rect if the box collides with the scene.
+        """
+        if self.collision_map is None:
+            self.bake_collisions()
+        return self.collision_map.collision_mask(rect, box, exact)
+
+    def free_map(self, box):
+        """
+        Boolean array [y, x] telling for every integer position of the
+        navigation area if the box is free of collision there. Baked once per
+        box. It is conservative: the positions the collision bitmaps can't
+        decide, less than 1% near the wall outlines, count as blocked.
+        """
+        key = tuple(box)
+        if key not in self.free_maps:
+            width, height = NAVIGATION.SIZE
+            rect = 0, 0, width, height
+            mask = self.collision_mask(rect, list(box), exact=False)
+            self.free_maps[key] = ~mask
+        return self.free_maps[key]
+
+    def destination_sampler(self, box):
+        key = tuple(box)
+        if key not in self.destination_samplers:
+            sampler = DestinationSampler(self, box)
+            self.destination_samplers[key] = sampler
+        return self.destination_samplers[key]
 
     def cross(self, path):
         for element in self.elements:
@@ -391,11 +716,17 @@ class Scene:
                 continue
             if path_cross_rect(path, element.screen_box):
                 return True
-        if any(path_cross_rect(zone, path) for zone in self.no_go_zones):
+        if any(path_cross_rect(path, zone) for zone in self.no_go_zones):
             return True
         return any(path_cross_polygon(path, wall) for wall in self.walls)
 
+    @profiled('Scene.collide')
     def collide(self, box):
+        if self.collision_map is None:
+            return self.collide_exact(box)
+        return self.collision_map.collide(box)
+
+    def collide_exact(self, box):
         for element in self.elements:
             if not isinstance(element, Prop) or not element.screen_box:
                 continue
@@ -405,9 +736,19 @@ class Scene:
             return True
         return any(box_hit_polygon(box, wall) for wall in self.walls)
 
+    @profiled('Scene.__next__')
     def __next__(self):
+        self.timers.advance()
+        # The inert characters sleep until a timer or another character
+        # wakes them up. A character woken during the tick is evaluated in
+        # its usual turn.
+        sleeping = self.sleeping
         for evaluable in self.npcs + self.players:
+            if evaluable.character in sleeping:
+                continue
             next(evaluable)
+            if evaluable.inert:
+                sleeping.add(evaluable.character)
 
         if self.black_screen_countdown or self.white_screen_countdown:
             if self.white_screen_countdown:
@@ -418,6 +759,9 @@ class Scene:
             return
         self.possible_duels = find_possible_duels(self)
 
+    def wake(self, character):
+        self.sleeping.discard(character)
+
     def find_player(self, character):
         for player in self.players:
             if player.character == character:
@@ -0,0 +1,91 @@
+import heapq
+import itertools
+
+
+class Timer:
+    __slots__ = ('due', 'callback', 'cancelled')
+
+    def __init__(self, due, callback):
+        self.due = due
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Priority queue of callbacks registered at an absolute tick. The scene
+    advances it once per tick, so waiting for a countdown doesn't cost
+    anything until it expires.
+    """
+
+    def __init__(self):
+        self.tick = 0
+        self.queue = []
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, delay, callback):
+        timer = Timer(self.tick + delay, callback)
+        # The counter keeps timers due at the same tick in registration order.
+        heapq.heappush(self.queue, (timer.due, next(self.counter), timer))
+        return timer
+
+    def advance(self):
+        self.tick += 1
+        while self.queue and self.queue[0][0] <= self.tick:
+            timer = heapq.heappop(self.queue)[2]
+            if not timer.cancelled:
+                timer.callback()
+
+
+class Countdown:
+    """
+    Timer running only while its character has one of the given statuses.
+    It is paused and resumed on the status changes, so it expires after as
+    many ticks spent in those statuses as a per tick countdown would.
+    """
+
+    def __init__(self, scheduler, callback, statuses):
+        self.scheduler = scheduler
+        self.callback = callback
+        self.statuses = statuses
+        self.remaining = None
+        self.timer = None
+        self.running = False
+
+    def start(self, delay):
+        self.pause()
+        self.remaining = delay
+        if self.running:
+            self.resume()
+
+    def follow(self, status):
+        running = status in self.statuses
+        if running == self.running:
+            return
+        self.running = running
+        if running:
+            self.resume()
+        else:
+            self.pause()
+
+    def resume(self):
+        if self.remaining is not None:
+            self.timer = self.scheduler.schedule(self.remaining, self.expire)
+
+    def pause(self):
+        if self.timer is None:
+            return
+        self.remaining = self.timer.due - self.scheduler.tick
+        self.timer.cancel()
+        self.timer = None
+
+    def expire(self):
+        self.timer = None
+        self.remaining = None
+        self.callback()
@@ -0,0 +1,153 @@
+"""
+Share the decoded assets between processes. The exporting process copies
+the pixels of the scene images and of the skins in a shared memory block,
+laid out as a scene package. The worker processes build their surfaces on
+the pixels of the block without copying them, so N workers hold a single
+copy of the assets.
+"""
+import sys
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+import numpy
+import pygame
+from drunkparanoia import io
+from drunkparanoia.config import SKINS
+from drunkparanoia.decode import skin_datas
+from drunkparanoia.package import pack_package, package_size, unpack_package
+from drunkparanoia.scene import load_template
+
+
+# Blocks attached by this process. The surfaces point to their pixels, they
+# must outlive them.
+_attached = []
+
+
+def export_assets(scene_path):
+    """
+    Load the scene images and every skin, copy their pixels in a new shared
+    memory block and return it. The workers only need its name. The caller
+    owns the block and unlinks it once the workers are done.
+    """
+    load_template(scene_path)
+    manifest = {
+        'scene': scene_path,
+        'indexed': SKINS.INDEXED,
+        'images': [],
+        'sheets': [],
+        'frames': []}
+    arrays = {}
+    for filename, handle in io.loaded_images().items():
+        image = io.get_image(handle)
+        index = len(manifest['images'])
+        # The images are exported in their blit format.
+        alpha = image.get_flags() & pygame.SRCALPHA
+        format = 'BGRA' if alpha else 'RGBX'
+        arrays[f'images/{index}'] = image_pixels(image, format)
+        key_color = image.get_colorkey()
+        manifest['images'].append({
+            'file': filename,
+            'size': list(image.get_size()),
+            'format': format,
+            'key_color': key_color and list(key_color[:3])})
+
+    for data in skin_datas():
+        skin = io.load_skin(data)
+        for side in ('face', 'back'):
+            filepath = data['sheets'][side]
+            sheets = io.indexed_sheets(filepath) if skin.indexed else None
+            if sheets is not None:
+                index = len(manifest['sheets'])
+                arrays[f'sheets/{index}'] = image_pixels(sheets[0], 'P')
+                arrays[f'flipped/{index}'] = image_pixels(sheets[1], 'P')
+                manifest['sheets'].append({
+                    'file': filepath,
+                    'size': list(sheets[0].get_size()),
+                    'palette': [
+                        list(color)[:3] for color in sheets[0].get_palette()]})
+                continue
+            # Recolored skins: every frame of every variation.
+            for variation in range(len(skin)):
+                handles = skin[variation][side]
+                index = len(manifest['frames'])
+                arrays[f'frames/{index}'] = numpy.stack([
+                    image_pixels(io.get_image(h), 'RGBX') for h in handles])
+                arrays[f'mirrors/{index}'] = numpy.stack([
+                    image_pixels(io.get_image(io.image_mirror(h)), 'RGBX')
+                    for h in handles])
+                colors = data['variations'][variation - 1] if variation else []
+                manifest['frames'].append({
+                    'file': filepath,
+                    'frame_size': data['framesize'],
+                    'variation': variation,
+                    'colors': colors})
+
+    size = package_size(manifest, arrays)
+    memory = shared_memory.SharedMemory(create=True, size=size)
+    pack_package(memory.buf, manifest, arrays)
+    return memory
+
+
+def image_pixels(image, format):
+    width, height = image.get_size()
+    pixels = numpy.frombuffer(
+        pygame.image.tobytes(image, format), dtype=numpy.uint8)
+    return pixels.reshape(height, width, -1)
+
+
+def attach_assets(name):
+    """
+    Register the assets of a shared memory block, the surfaces use the
+    pixels of the block. Return the path of the exported scene.
+    """
+    memory = attach_block(name)
+    _attached.append(memory)
+    manifest, arrays = unpack_package(memory.buf, name)
+    if manifest['indexed'] != SKINS.INDEXED:
+        raise ValueError(
+            f'The shared assets {name} do not match the SKINS.INDEXED '
+            'setting of this process.')
+
+    for i, entry in enumerate(manifest['images']):
+        if io.image_handle(entry['file']) is not None:
+            continue
+        surface = pygame.image.frombuffer(
+            arrays[f'images/{i}'], entry['size'], entry['format'])
+        io.store_image(
+            entry['file'], surface, entry['key_color'], normalize=False)
+
+    for i, entry in enumerate(manifest['sheets']):
+        sheets = []
+        for prefix in ('sheets', 'flipped'):
+            sheet = pygame.image.frombuffer(
+                arrays[f'{prefix}/{i}'], entry['size'], 'P')
+            sheet.set_palette(entry['palette'])
+            sheets.append(sheet)
+        io.store_indexed_sheet(entry['file'], *sheets)
+
+    # The original colors of a sheet are exported before its variations.
+    for i, entry in enumerate(manifest['frames']):
+        size = entry['frame_size']
+        images = [
+            pygame.image.frombuffer(pixels, size, 'RGBX')
+            for pixels in arrays[f'frames/{i}']]
+        mirrors = [
+            pygame.image.frombuffer(pixels, size, 'RGBX')
+            for pixels in arrays[f'mirrors/{i}']]
+        palette1 = [colors[0] for colors in entry['colors']]
+        palette2 = [colors[1] for colors in entry['colors']]
+        io.store_frames(
+            entry['file'], size, SKINS.KEY_COLOR, images, palette1, palette2,
+            entry['variation'], mirrors, normalize=False)
+    return manifest['scene']
+
+
+def attach_block(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    memory = shared_memory.SharedMemory(name)
+    if multiprocessing.parent_process() is None:
+        # Before Python 3.13, attaching registers the block to the resource
+        # tracker of the process, which unlinks it when the process exits.
+        # The multiprocessing children share the tracker of their parent.
+        resource_tracker.unregister(memory._name, 'shared_memory')
+    return memory
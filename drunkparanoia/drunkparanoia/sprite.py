@@ -6,10 +6,33 @@ from drunkparanoia.io import load_skin, image_mirror
 class SpriteSheet:
     def __init__(self, data):
         self.data = data
+        self.table = None
+        self.row = None
         self.animation = 'idle'
         self.index = random.randrange(0, self.animation_length() - 1)
         self.images = load_skin(data)
 
+    def bind(self, table, row):
+        """
+        Move the animation index to a CharacterTable row.
+        """
+        table.animation_index[row] = self.index
+        self.table = table
+        self.row = row
+
+    @property
+    def index(self):
+        if self.table is None:
+            return self._index
+        return self.table.animation_index.item(self.row)
+
+    @index.setter
+    def index(self, value):
+        if self.table is None:
+            self._index = value
+            return
+        self.table.animation_index[self.row] = value
+
     @property
     def variation_count(self):
         return len(self.data['variations']) + 1
@@ -24,7 +47,7 @@ class SpriteSheet:
         side = DIRECTION_TO_SIDE[direction]
         image = self.images[variation][side][index]
         flipped = direction in DIRECTIONS.FLIPPED
-        return image_mirror(image, horizontal=True) if flipped else image
+        return image_mirror(image) if flipped else image
 
     def animation_length(self):
         return sum(self.durations)
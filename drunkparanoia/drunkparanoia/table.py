@@ -0,0 +1,101 @@
+"""
+Scene level struct of arrays storing the per tick mutable state of every
+character. A Character is a thin view over one row of the table, that allows
+to compute crowd wide queries (e.g. duel candidates) in vectorized passes.
+"""
+import numpy
+from drunkparanoia.config import DIRECTIONS, CHARACTER_STATUSES
+from drunkparanoia.coordinates import Coordinates
+
+
+STATUSES = (
+    CHARACTER_STATUSES.FREE,
+    CHARACTER_STATUSES.AUTOPILOT,
+    CHARACTER_STATUSES.STUCK,
+    CHARACTER_STATUSES.INTERACTING,
+    CHARACTER_STATUSES.DUEL_ORIGIN,
+    CHARACTER_STATUSES.DUEL_TARGET,
+    CHARACTER_STATUSES.OUT)
+STATUS_IDS = {status: i for i, status in enumerate(STATUSES)}
+
+DIRECTION_VALUES = (DIRECTIONS.NO,) + DIRECTIONS.ALL
+DIRECTION_IDS = {direction: i for i, direction in enumerate(DIRECTION_VALUES)}
+
+DUELABLE_STATUSES = numpy.array(
+    [status in CHARACTER_STATUSES.DUELABLES for status in STATUSES])
+VERTICAL_DIRECTIONS = numpy.array(
+    [d in (DIRECTIONS.UP, DIRECTIONS.DOWN) for d in DIRECTION_VALUES])
+RIGHT_DIRECTIONS = numpy.array(
+    [d in DIRECTIONS.RIGHTS for d in DIRECTION_VALUES])
+LEFT_DIRECTIONS = numpy.array(
+    [d in DIRECTIONS.LEFTS for d in DIRECTION_VALUES])
+
+
+class CharacterTable:
+    COLUMNS = {
+        'x': numpy.float64,
+        'y': numpy.float64,
+        'speed': numpy.float64,
+        'direction': numpy.int8,
+        'status': numpy.int8,
+        'animation_index': numpy.int32,
+    }
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.capacity = capacity
+        self.characters = []
+        for name, dtype in self.COLUMNS.items():
+            setattr(self, name, numpy.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self.size
+
+    def append(self, character):
+        if self.size == self.capacity:
+            self.grow()
+        row = self.size
+        self.size += 1
+        self.characters.append(character)
+        return row
+
+    def grow(self):
+        self.capacity *= 2
+        for name, dtype in self.COLUMNS.items():
+            array = numpy.zeros(self.capacity, dtype=dtype)
+            array[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, array)
+
+    def column(self, name):
+        return getattr(self, name)[:self.size]
+
+    def duelable_mask(self):
+        return DUELABLE_STATUSES[self.column('status')]
+
+
+class TableCoordinates(Coordinates):
+    """
+    Coordinates reading and writing their values in a CharacterTable row.
+    """
+
+    def __init__(self, table, row, position=None):
+        self.table = table
+        self.row = row
+        if position is not None:
+            self.position = position
+
+    @property
+    def x(self):
+        return self.table.x.item(self.row)
+
+    @x.setter
+    def x(self, value):
+        self.table.x[self.row] = value
+
+    @property
+    def y(self):
+        return self.table.y.item(self.row)
+
+    @y.setter
+    def y(self, value):
+        self.table.y[self.row] = value
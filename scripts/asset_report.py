@@ -0,0 +1,63 @@
+"""
+Print the memory footprint of the images per category after loading the
+main resources, a scene and every skin, then after playing some ticks.
+
+Usage:
+    python scripts/asset_report.py [--scene resources/scenes/saloon.json]
+        [--ticks 600] [--budget MB] [--indexed]
+"""
+
+import os
+import sys
+import random
+import argparse
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.join(os.path.dirname(here), 'drunkparanoia')
+sys.path.insert(0, root)
+
+import pygame  # noqa
+from drunkparanoia import io  # noqa
+from drunkparanoia.config import ASSETS, SKINS  # noqa
+from drunkparanoia.render import render_game  # noqa
+from drunkparanoia.replay import NullClock  # noqa
+from drunkparanoia.scene import GameLoop  # noqa
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scene', default='resources/scenes/saloon.json')
+    parser.add_argument('--ticks', type=int, default=600)
+    parser.add_argument('--budget', type=float, help='in MB')
+    parser.add_argument(
+        '--indexed', action='store_true',
+        help='build the skins as 8 bits palettized sheets')
+    options = parser.parse_args()
+    if options.budget is not None:
+        ASSETS.BUDGET = int(options.budget * 1024 * 1024)
+    SKINS.INDEXED = options.indexed
+
+    pygame.init()
+    screen = pygame.display.set_mode((640, 360))
+    random.seed(0)
+    io.load_main_resources()
+    loop = GameLoop()
+    loop.clock = NullClock()
+    loop.set_scene(options.scene)
+    loop.start_scene()
+    io.load_skins()
+    print('loaded:')
+    print(io.format_memory_usage())
+
+    for _ in range(options.ticks):
+        next(loop)
+        render_game(screen, loop)
+    print(f'\nafter {options.ticks} ticks:')
+    print(io.format_memory_usage())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Audit the format of the loaded images and their blit cost: bits per pixel,
+per pixel alpha and whether it is really used, color key and RLE
+acceleration, and the time to blit each image onto the display.
+
+Usage:
+    python scripts/audit_assets.py [--raw] [--blits 200] [--top 15]
+
+--raw audits the images as decoded, without the blit format normalization.
+"""
+
+import os
+import sys
+import timeit
+import argparse
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.join(os.path.dirname(here), 'drunkparanoia')
+sys.path.insert(0, root)
+
+import numpy  # noqa
+import pygame  # noqa
+from drunkparanoia import io  # noqa
+from drunkparanoia.config import ASSETS  # noqa
+from drunkparanoia.scene import load_template  # noqa
+
+
+def alpha_usage(image):
+    if not image.get_flags() & pygame.SRCALPHA:
+        return '-'
+    alpha = pygame.surfarray.array_alpha(image)
+    if numpy.all(alpha == 255):
+        return 'unused'
+    if numpy.all((alpha == 0) | (alpha == 255)):
+        return 'binary'
+    return 'partial'
+
+
+def image_format(image):
+    flags = image.get_flags()
+    parts = [f'{image.get_bitsize()}bits']
+    if flags & pygame.SRCALPHA:
+        parts.append('alpha')
+    if image.get_colorkey() is not None:
+        parts.append('key')
+    if flags & (pygame.RLEACCEL | pygame.RLEACCELOK):
+        parts.append('rle')
+    if image.get_parent() is not None:
+        parts.append('sub')
+    return '+'.join(parts)
+
+
+def blit_cost(image, target, blits):
+    """
+    Microseconds per blit of the image onto the target.
+    """
+    timer = timeit.Timer(lambda: target.blit(image, (0, 0)))
+    return min(timer.repeat(repeat=3, number=blits)) / blits * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scene', default='resources/scenes/saloon.json')
+    parser.add_argument('--raw', action='store_true')
+    parser.add_argument('--blits', type=int, default=200)
+    parser.add_argument('--top', type=int, default=15)
+    options = parser.parse_args()
+    ASSETS.NORMALIZE = not options.raw
+
+    pygame.init()
+    screen = pygame.display.set_mode((640, 360))
+    io.load_main_resources()
+    load_template(options.scene)
+    io.load_skins()
+
+    names = {handle: name for name, handle in io.loaded_images().items()}
+    target = screen.copy()
+    rows = []
+    for handle, category, image in io.registered_images():
+        # The 8 bits sheets are never blitted, only their frames.
+        if image.get_bitsize() == 8 and image.get_parent() is None:
+            continue
+        rows.append({
+            'name': names.get(handle, f'#{handle}'),
+            'category': category,
+            'format': image_format(image),
+            'alpha': alpha_usage(image),
+            'pixels': image.get_width() * image.get_height(),
+            'cost': blit_cost(image, target, options.blits)})
+
+    groups = {}
+    for row in rows:
+        key = row['category'], row['format'], row['alpha']
+        groups.setdefault(key, []).append(row)
+    header = (
+        f'{"category":<12}{"format":<24}{"alpha":<9}{"images":>7}'
+        f'{"us/blit":>10}{"ns/pixel":>10}')
+    print(header)
+    print('-' * len(header))
+    for (category, format, alpha), group in sorted(groups.items()):
+        cost = sum(row['cost'] for row in group) / len(group)
+        pixels = sum(row['pixels'] for row in group) / len(group)
+        print(
+            f'{category:<12}{format:<24}{alpha:<9}{len(group):>7}'
+            f'{cost:>10.2f}{cost * 1000 / pixels:>10.2f}')
+
+    print('\nslowest named images:')
+    named = sorted(
+        (row for row in rows if not row['name'].startswith('#')),
+        key=lambda row: -row['cost'])
+    for row in named[:options.top]:
+        print(
+            f'{row["name"]:<48}{row["format"]:<22}{row["alpha"]:<9}'
+            f'{row["cost"]:>8.1f} us')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,383 @@
+"""
+Benchmark suite for the engine code running every frame.
+It runs headless through the SDL dummy video driver.
+
+Usage:
+    python scripts/benchmark.py                 # run and compare to baseline
+    python scripts/benchmark.py --save          # run and store as baseline
+    python scripts/benchmark.py -k collide -k duel --npcs 64 --threshold .1
+
+The reference timings live in scripts/benchmark_baseline.json, recorded
+with --save and the default options. Its metadata gives the Python and
+pygame versions and the architecture. Timings only compare on the same
+machine: record a local baseline with --save (or in another file
+with --baseline) before measuring a change.
+"""
+
+import os
+import sys
+import json
+import timeit
+import random
+import argparse
+import tempfile
+import platform
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(here), 'drunkparanoia'))
+
+import pygame  # noqa
+from drunkparanoia import io  # noqa
+from drunkparanoia.config import GAMEROOT  # noqa
+
+
+SCENE = 'resources/scenes/saloon.json'
+DEFAULT_BASELINE = os.path.join(here, 'benchmark_baseline.json')
+SEED = 0
+BENCHMARKS = {}
+
+
+def benchmark(name, number=10, repeat=5):
+    """
+    Register a benchmark case. The decorated function receives the parsed
+    command line options, prepares its data and returns the callable to
+    time.
+    """
+    def decorator(func):
+        BENCHMARKS[name] = func, number, repeat
+        return func
+    return decorator
+
+
+def init_display():
+    if not pygame.display.get_init():
+        pygame.init()
+        pygame.display.set_mode((640, 360))
+
+
+def build_scene(npcs):
+    from drunkparanoia.scene import load_scene
+    random.seed(SEED)
+    scene = load_scene(SCENE)
+    while len(scene.characters) < npcs:
+        scene.build_character()
+    scene.create_npcs()
+    return scene
+
+
+def random_boxes(count, box=(-10, -8, 20, 10)):
+    boxes = []
+    for _ in range(count):
+        x, y = random.randrange(0, 640), random.randrange(0, 360)
+        boxes.append([box[0] + x, box[1] + y, box[2], box[3]])
+    return boxes
+
+
+@benchmark('io.swap_colors', number=1, repeat=3)
+def bench_swap_colors(_):
+    data = io.load_data('resources/animdata/smith.json')
+    variation = data['variations'][0]
+    palette1 = [colors[0] for colors in variation]
+    palette2 = [colors[1] for colors in variation]
+    sheet = pygame.image.load(f'{GAMEROOT}/{data["sheets"]["face"]}')
+    sheet = sheet.convert()
+    return lambda: io.swap_colors(sheet, palette1, palette2)
+
+
+@benchmark('io.load_skins', number=1, repeat=3)
+def bench_load_skins(_):
+    def load_skins():
+        io._animation_store.clear()
+        io._skins.clear()
+        io.load_skins()
+    return load_skins
+
+
+def forget_scene_images():
+    """
+    Drop the scene images from the store so the next load decodes them
+    again, as the first round does.
+    """
+    from drunkparanoia.scene import scene_images
+    for filename, _ in scene_images(io.load_data(SCENE)):
+        if io.image_handle(filename) is not None:
+            io.unload_image(filename)
+
+
+def compiled_scene():
+    from drunkparanoia.scene import compile_scene
+    directory = tempfile.mkdtemp()
+    return compile_scene(SCENE, os.path.join(directory, 'scene.pack'))
+
+
+@benchmark('scene.load_scene', number=5, repeat=5)
+def bench_load_scene(_):
+    from drunkparanoia.scene import parse_scene
+    return lambda: parse_scene(SCENE)
+
+
+@benchmark('scene.load_scene[cold]', number=5, repeat=5)
+def bench_load_scene_cold(_):
+    from drunkparanoia.scene import parse_scene
+
+    def load_scene():
+        forget_scene_images()
+        parse_scene(SCENE)
+    return load_scene
+
+
+@benchmark('scene.load_scene[package]', number=20, repeat=5)
+def bench_load_scene_package(_):
+    from drunkparanoia.scene import load_scene_package
+    path = compiled_scene()
+    return lambda: load_scene_package(path)
+
+
+@benchmark('scene.load_scene[package,cold]', number=20, repeat=5)
+def bench_load_scene_package_cold(_):
+    from drunkparanoia.scene import load_scene_package
+    path = compiled_scene()
+
+    def load_scene():
+        forget_scene_images()
+        load_scene_package(path)
+    return load_scene
+
+
+@benchmark('Scene.collide', number=5, repeat=5)
+def bench_collide(options):
+    scene = build_scene(options.npcs)
+    boxes = random_boxes(100)
+    return lambda: [scene.collide(box) for box in boxes]
+
+
+@benchmark('Scene.cross', number=5, repeat=5)
+def bench_cross(options):
+    scene = build_scene(options.npcs)
+    paths = [
+        [(random.randrange(640), random.randrange(360)),
+         (random.randrange(640), random.randrange(360))]
+        for _ in range(100)]
+    return lambda: [scene.cross(path) for path in paths]
+
+
+@benchmark('duel.find_possible_duels', number=20, repeat=5)
+def bench_find_possible_duels(options):
+    from drunkparanoia.duel import find_possible_duels
+    scene = build_scene(options.npcs)
+    return lambda: find_possible_duels(scene)
+
+
+@benchmark('SpriteSheet.image', number=50, repeat=5)
+def bench_spritesheet_image(options):
+    scene = build_scene(options.npcs)
+    characters = scene.characters
+    return lambda: [c.image for c in characters]
+
+
+def random_walkable_pairs(grid, count):
+    cells = [
+        (column, row) for row in range(grid.rows)
+        for column in range(grid.columns) if grid.walkable[row][column]]
+    return [
+        (grid.cell_center(random.choice(cells)),
+         grid.cell_center(random.choice(cells)))
+        for _ in range(count)]
+
+
+@benchmark('NavigationGrid.bake', number=1, repeat=3)
+def bench_navigation_bake(options):
+    from drunkparanoia.pathfinding import NavigationGrid
+    scene = build_scene(options.npcs)
+    box = scene.characters[0].box
+    return lambda: NavigationGrid(scene, box)
+
+
+@benchmark('NavigationGrid.find_path', number=1, repeat=5)
+def bench_find_path(options):
+    scene = build_scene(options.npcs)
+    grid = scene.navigation_grid(scene.characters[0].box)
+    pairs = random_walkable_pairs(grid, 100)
+
+    def find_paths():
+        grid.cache.clear()
+        return [grid.find_path(origin, dst) for origin, dst in pairs]
+    return find_paths
+
+
+@benchmark('NavigationGrid.find_path[cached]', number=10, repeat=5)
+def bench_find_path_cached(options):
+    scene = build_scene(options.npcs)
+    grid = scene.navigation_grid(scene.characters[0].box)
+    pairs = random_walkable_pairs(grid, 100)
+    return lambda: [grid.find_path(origin, dst) for origin, dst in pairs]
+
+
+@benchmark('DestinationSampler.choice', number=10, repeat=5)
+def bench_destination_choice(options):
+    scene = build_scene(options.npcs)
+    sampler = scene.destination_sampler(scene.characters[0].box)
+    points = [c.coordinates.position for c in scene.characters]
+    return lambda: [sampler.choice(point) for point in points]
+
+
+@benchmark('DestinationSampler.choice[fallback]', number=10, repeat=5)
+def bench_destination_choice_fallback(options):
+    # Out of every target origin, the destination is drawn around the point.
+    scene = build_scene(options.npcs)
+    sampler = scene.destination_sampler(scene.characters[0].box)
+    points = []
+    while len(points) < options.npcs:
+        point = random.randrange(0, 640), random.randrange(0, 360)
+        target_indexes = scene.target_map.all(point)
+        if not sampler.distribution(target_indexes)[0]:
+            points.append(point)
+    return lambda: [sampler.choice(point) for point in points]
+
+
+@benchmark('Scene.reset', number=20, repeat=5)
+def bench_scene_reset(options):
+    scene = build_scene(options.npcs)
+    return scene.reset
+
+
+@benchmark('Scene.__next__', number=50, repeat=5)
+def bench_scene_next(options):
+    scene = build_scene(options.npcs)
+    return lambda: next(scene)
+
+
+@benchmark('Scene.__next__[late]', number=50, repeat=5)
+def bench_scene_next_late(options):
+    # Late in a round most npcs lie in coma.
+    scene = build_scene(options.npcs)
+    for _ in range(3000):
+        next(scene)
+    return lambda: next(scene)
+
+
+@benchmark('render.render_scene', number=20, repeat=5)
+def bench_render_scene(options):
+    from drunkparanoia.render import render_scene
+    scene = build_scene(options.npcs)
+    for _ in range(60):
+        next(scene)
+    screen = pygame.display.get_surface()
+    return lambda: render_scene(screen, scene)
+
+
+def scene_elements(options):
+    scene = build_scene(options.npcs)
+    for _ in range(60):
+        next(scene)
+    return pygame.display.get_surface(), scene.elements
+
+
+@benchmark('render.elements[per element]', number=50, repeat=5)
+def bench_render_elements(options):
+    from drunkparanoia.render import render_element
+    screen, elements = scene_elements(options)
+
+    def render():
+        for element in sorted(elements, key=lambda elt: elt.switch):
+            render_element(screen, element)
+    return render
+
+
+@benchmark('render.elements[blits]', number=50, repeat=5)
+def bench_render_elements_blits(options):
+    from drunkparanoia.render import element_blits
+    screen, elements = scene_elements(options)
+    return lambda: screen.blits(element_blits(elements), doreturn=False)
+
+
+def run(options):
+    init_display()
+    io.load_skins()
+    io.load_main_resources()
+    results = {}
+    for name, (setup, number, repeat) in BENCHMARKS.items():
+        if options.keyword and not any(k in name for k in options.keyword):
+            continue
+        random.seed(SEED)
+        function = setup(options)
+        timer = timeit.Timer(function)
+        timings = timer.repeat(repeat=repeat, number=number)
+        best = min(timings) / number * 1000
+        results[name] = {'ms': best, 'number': number, 'repeat': repeat}
+        print(f'{name:<40}{best:>12.4f} ms')
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f'\n{"benchmark":<40}{"baseline":>12}{"current":>12}{"ratio":>9}')
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f'{name:<40}{"-":>12}{result["ms"]:>12.4f}{"new":>9}')
+            continue
+        ratio = result['ms'] / reference['ms']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(
+            f'{name:<40}{reference["ms"]:>12.4f}{result["ms"]:>12.4f}'
+            f'{ratio:>9.2f}{flag}')
+    return regressions
+
+
+def metadata(options):
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'npcs': options.npcs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true')
+    parser.add_argument('--threshold', type=float, default=.2)
+    parser.add_argument('--npcs', type=int, default=32)
+    parser.add_argument('-k', '--keyword', action='append')
+    options = parser.parse_args()
+
+    results = run(options)
+
+    if options.save:
+        baseline = {}
+        if os.path.exists(options.baseline):
+            with open(options.baseline, 'r') as f:
+                baseline = json.load(f)['results']
+        baseline.update(results)
+        with open(options.baseline, 'w') as f:
+            data = {'meta': metadata(options), 'results': baseline}
+            json.dump(data, f, indent=2)
+        print(f'\nBaseline saved to {options.baseline}')
+        return 0
+
+    if not os.path.exists(options.baseline):
+        print('\nNo baseline found, run with --save to create one.')
+        return 0
+    with open(options.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline['meta'].get('npcs') != options.npcs:
+        print('\nWarning: baseline was recorded with a different npc count.')
+    regressions = compare(results, baseline['results'], options.threshold)
+    if regressions:
+        print(
+            f'\n{len(regressions)} regression(s) over '
+            f'{options.threshold:.0%}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Time the parallel skin loader from 1 to N worker processes against the
+serial loader, and check they build the same frames.
+
+Usage:
+    python scripts/benchmark_skin_loader.py [--workers 4] [--indexed]
+
+Every measure runs in its own process, with empty caches.
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.join(os.path.dirname(here), 'drunkparanoia')
+sys.path.insert(0, root)
+
+
+def measure(workers, indexed):
+    import time
+    import hashlib
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    import pygame
+    from drunkparanoia import io, decode
+
+    pygame.init()
+    pygame.display.set_mode((640, 360))
+    start = time.perf_counter()
+    if workers:
+        decode.load_skins(workers, indexed=indexed)
+    else:
+        for data in decode.skin_datas():
+            io.load_skin(data, indexed).load_all()
+    elapsed = time.perf_counter() - start
+
+    digest = hashlib.md5()
+    for data in decode.skin_datas():
+        for variation in io.load_skin(data, indexed):
+            for side in ('face', 'back'):
+                for handle in variation[side]:
+                    for handle in (handle, io.image_mirror(handle)):
+                        image = io.get_image(handle)
+                        digest.update(pygame.image.tobytes(image, 'RGB'))
+                        digest.update(repr(image.get_colorkey()).encode())
+    return {'time': elapsed, 'digest': digest.hexdigest()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument(
+        '--indexed', action='store_true',
+        help='build the skins as 8 bits palettized sheets')
+    parser.add_argument('--measure', type=int, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.measure is not None:
+        result = measure(options.measure, options.indexed)
+        print(json.dumps(result))
+        return 0
+
+    serial = None
+    print(f'{"workers":<10}{"seconds":>10}{"speedup":>10}  frames')
+    for workers in range(options.workers + 1):
+        command = [sys.executable, __file__, '--measure', str(workers)]
+        if options.indexed:
+            command.append('--indexed')
+        output = subprocess.run(
+            command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().split('\n')[-1])
+        serial = serial or result
+        same = 'same' if result['digest'] == serial['digest'] else 'DIFFER'
+        print(
+            f'{workers or "serial":<10}{result["time"]:>10.2f}'
+            f'{serial["time"] / result["time"]:>10.2f}  {same}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
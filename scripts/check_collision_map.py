@@ -0,0 +1,50 @@
+"""
+Check the baked collision map against the exact scene geometry for every
+pixel position of a scene, for each character box it uses.
+
+Usage:
+    python scripts/check_collision_map.py [resources/scenes/saloon.json]
+"""
+
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(here), 'drunkparanoia'))
+
+import pygame  # noqa
+from drunkparanoia.coordinates import get_box  # noqa
+from drunkparanoia.io import load_data  # noqa
+from drunkparanoia.scene import load_scene  # noqa
+
+
+def check(scene_path):
+    pygame.init()
+    pygame.display.set_mode((640, 360))
+    scene = load_scene(scene_path)
+    data = load_data(scene_path)
+    boxes = {tuple(load_data(c['file'])['box']) for c in data['characters']}
+    width, height = 640, 360
+    errors = 0
+    for box in boxes:
+        mask = scene.collision_mask((0, 0, width, height), list(box))
+        for y in range(height):
+            for x in range(width):
+                position_box = get_box((x, y), list(box))
+                expected = scene.collide_exact(position_box)
+                if scene.collide(position_box) != expected:
+                    errors += 1
+                    print(f'collide mismatch at {x}, {y} for box {box}')
+                if mask[y, x] != expected:
+                    errors += 1
+                    print(f'collision_mask mismatch at {x}, {y} for box {box}')
+    print(f'{scene_path}: {len(boxes)} box(es), {errors} mismatch(es)')
+    return errors
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else 'resources/scenes/saloon.json'
+    sys.exit(1 if check(path) else 0)
@@ -0,0 +1,88 @@
+"""
+Compare the 8 bits palettized skins with the recolored 32 bits skins: every
+frame and its mirror must render the same pixels, and the memory taken by
+the pixels of both modes is reported for every animdata file.
+
+Usage:
+    python scripts/check_indexed_skins.py
+"""
+
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(here), 'drunkparanoia'))
+
+import numpy  # noqa
+import pygame  # noqa
+from drunkparanoia import io  # noqa
+from drunkparanoia.config import GAMEROOT  # noqa
+
+
+BACKGROUND = 255, 0, 255
+
+
+def render(image):
+    surface = pygame.Surface(image.get_size()).convert()
+    surface.fill(BACKGROUND)
+    surface.blit(image, (0, 0))
+    return pygame.surfarray.array3d(surface)
+
+
+def pixels_size(images):
+    """
+    Bytes of the pixels owned by the images, shared pixels counted once.
+    """
+    owners = {}
+    for image in images:
+        owner = image.get_parent() or image
+        owners[id(owner)] = owner
+    size = sum(
+        s.get_width() * s.get_height() * s.get_bytesize()
+        for s in owners.values())
+    # 8 bits subsurfaces carry their own palette.
+    size += sum(
+        4 * len(image.get_palette()) for image in images
+        if image.get_bitsize() == 8)
+    return size
+
+
+def skin_images(skin):
+    handles = [
+        handle for variation in skin for side in variation.values()
+        for handle in side]
+    handles += [io.image_mirror(handle) for handle in handles]
+    return handles
+
+
+def check(filename):
+    data = io.load_data(f'resources/animdata/{filename}')
+    recolored = skin_images(io.load_skin(data, indexed=False))
+    indexed = skin_images(io.load_skin(data, indexed=True))
+    errors = 0
+    for handle1, handle2 in zip(recolored, indexed):
+        difference = render(io.get_image(handle1)) != render(
+            io.get_image(handle2))
+        errors += int(numpy.any(difference, axis=2).sum())
+    size1 = pixels_size([io.get_image(h) for h in recolored]) / 1024 / 1024
+    size2 = pixels_size([io.get_image(h) for h in indexed]) / 1024 / 1024
+    print(
+        f'{filename}: {len(data["variations"]) + 1} variation(s), '
+        f'{len(recolored)} frames, {errors} different pixel(s), '
+        f'recolored {size1:.1f} MB, indexed {size2:.1f} MB')
+    return errors
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((640, 360))
+    directory = f'{GAMEROOT}/resources/animdata'
+    errors = sum(check(filename) for filename in sorted(os.listdir(directory)))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
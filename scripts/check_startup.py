@@ -0,0 +1,61 @@
+"""
+Launch the game under the dummy video driver in startup profile mode and
+check the time to first frame against the budget.
+
+Usage:
+    python scripts/check_startup.py [--budget 1.5] [--runs 3]
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.join(os.path.dirname(here), 'drunkparanoia')
+sys.path.insert(0, root)
+
+from drunkparanoia import profiler  # noqa
+from drunkparanoia.config import STARTUP  # noqa
+
+
+def profile_startup():
+    with tempfile.TemporaryDirectory() as directory:
+        report_path = os.path.join(directory, 'startup.json')
+        env = dict(
+            os.environ,
+            SDL_VIDEODRIVER='dummy',
+            SDL_AUDIODRIVER='dummy',
+            PYGAME_HIDE_SUPPORT_PROMPT='1',
+            DRUNKPARANOIA_STARTUP_PROFILE=report_path,
+            DRUNKPARANOIA_MAX_FRAMES='1')
+        subprocess.run(
+            [sys.executable, '-m', 'drunkparanoia'], cwd=root, env=env,
+            check=True, stdout=subprocess.DEVNULL)
+        with open(report_path, 'r') as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--budget', type=float, default=STARTUP.BUDGET)
+    parser.add_argument('--runs', type=int, default=3)
+    options = parser.parse_args()
+
+    reports = [profile_startup() for _ in range(options.runs)]
+    best = min(reports, key=lambda r: r['time_to_first_frame'])
+    print(profiler.format_startup_report(best))
+    seconds = best['time_to_first_frame'] / 1000
+    print(
+        f'\nbest of {options.runs}: {seconds:.2f} s, '
+        f'budget {options.budget} s')
+    if seconds > options.budget:
+        print('Startup budget exceeded.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Compare the eager and the on demand building of the skin color variations:
+time to start the scene (the dispatch screen can be displayed), time to
+start the battle (every character is spawned), peak of resident pixels and
+peak memory of the process.
+
+Usage:
+    python scripts/compare_skin_loading.py [--ticks 300] [--indexed]
+
+Every mode runs in its own process, the game plays without joysticks.
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import subprocess
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.join(os.path.dirname(here), 'drunkparanoia')
+sys.path.insert(0, root)
+
+MODES = {
+    'eager': {'LAZY_VARIATIONS': False, 'WARM_VARIATIONS': False},
+    'lazy': {'LAZY_VARIATIONS': True, 'WARM_VARIATIONS': False},
+    'lazy+warm': {'LAZY_VARIATIONS': True, 'WARM_VARIATIONS': True}}
+
+
+def measure(mode, ticks, indexed):
+    import time
+    import resource
+    start = time.perf_counter()
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    import pygame
+    from drunkparanoia import io
+    from drunkparanoia.config import SKINS, LOOP_STATUSES
+    from drunkparanoia.render import render_game
+    from drunkparanoia.replay import NullClock
+    from drunkparanoia.scene import GameLoop
+    SKINS.INDEXED = indexed
+    for name, value in MODES[mode].items():
+        setattr(SKINS, name, value)
+
+    pygame.init()
+    screen = pygame.display.set_mode((640, 360))
+    random.seed(0)
+    io.load_main_resources()
+    loop = GameLoop()
+    loop.clock = NullClock()
+    loop.set_scene('resources/scenes/saloon.json')
+    loop.start_scene()
+    loop.preload()
+    result = {'start': time.perf_counter() - start}
+    peak = 0
+    for tick in range(ticks):
+        next(loop)
+        render_game(screen, loop)
+        if loop.status == LOOP_STATUSES.BATTLE and 'battle' not in result:
+            result['battle'] = time.perf_counter() - start
+        usage = io.memory_usage()
+        peak = max(peak, sum(stats['bytes'] for stats in usage.values()))
+    # Let the preloader finish before the last measure.
+    loop.preloader.take()
+    usage = io.memory_usage()
+    peak = max(peak, sum(stats['bytes'] for stats in usage.values()))
+    result['pixels'] = peak
+    result['maxrss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--ticks', type=int, default=300)
+    parser.add_argument(
+        '--indexed', action='store_true',
+        help='build the skins as 8 bits palettized sheets')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.mode:
+        result = measure(options.mode, options.ticks, options.indexed)
+        print(json.dumps(result))
+        return 0
+
+    print(
+        f'{"mode":<12}{"start s":>10}{"battle s":>10}'
+        f'{"pixels MB":>11}{"max rss MB":>12}')
+    for mode in MODES:
+        command = [
+            sys.executable, __file__, '--mode', mode,
+            '--ticks', str(options.ticks)]
+        if options.indexed:
+            command.append('--indexed')
+        output = subprocess.run(
+            command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().split('\n')[-1])
+        print(
+            f'{mode:<12}{result["start"]:>10.2f}'
+            f'{result["battle"]:>10.2f}'
+            f'{result["pixels"] / 1024 ** 2:>11.1f}'
+            f'{result["maxrss"] / 1024:>12.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Compile the scenes json and their assets into binary packages written next
+to them. The game loads a package instead of the json while it is more
+recent than every file it was built from.
+
+Usage:
+    python scripts/compile_scenes.py [resources/scenes/saloon.json ...]
+"""
+
+import os
+import sys
+import glob
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(here), 'drunkparanoia'))
+
+import pygame  # noqa
+from drunkparanoia.config import GAMEROOT  # noqa
+from drunkparanoia.scene import compile_scene  # noqa
+
+
+def main(filenames):
+    pygame.init()
+    pygame.display.set_mode((640, 360))
+    if not filenames:
+        filenames = sorted(
+            os.path.relpath(path, GAMEROOT) for path in
+            glob.glob(f'{GAMEROOT}/resources/scenes/*.json'))
+    for filename in filenames:
+        start = time.perf_counter()
+        output = compile_scene(filename)
+        duration = (time.perf_counter() - start) * 1000
+        size = os.path.getsize(output) / 1024 / 1024
+        print(f'{filename} -> {output} ({size:.1f} MB, {duration:.0f} ms)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
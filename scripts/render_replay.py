@@ -0,0 +1,196 @@
+"""
+Render a recorded session offscreen, split in tick ranges rendered by worker
+processes, and stitch the frames into a video or an image sequence.
+
+Record a session with:
+    DRUNKPARANOIA_RECORD=session.json python -m drunkparanoia
+
+Usage:
+    python scripts/render_replay.py session.json --output frames
+        [--workers 4] [--chunk 600] [--video session.mp4] [--private-assets]
+
+Every worker re-simulates its range from the start of the session without
+rendering, then renders the ticks of the range. The assets are decoded once
+in shared memory for all the workers, unless --private-assets is given.
+The frames are written as frame_<tick>.png in the output directory, with a
+timeline.txt listing them with their durations (ffmpeg concat format). The
+video is encoded with ffmpeg when it is available.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+import multiprocessing
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.join(os.path.dirname(here), 'drunkparanoia')
+sys.path.insert(0, root)
+
+
+def render_range(filepath, start, end, output, assets=None):
+    """
+    Worker: simulate the ticks before the range, render the range. Return
+    the (tick, framerate) of the rendered frames, the time spent in
+    simulation and rendering and the private memory of the worker.
+    """
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    import pygame
+    from drunkparanoia.io import load_main_resources
+    from drunkparanoia.render import render_game
+    from drunkparanoia.replay import Replay, load_replay
+
+    pygame.init()
+    screen = pygame.display.set_mode((640, 360))
+    if assets:
+        from drunkparanoia.shared import attach_assets
+        attach_assets(assets)
+    load_main_resources()
+    replay = Replay(load_replay(filepath))
+
+    started = time.perf_counter()
+    for _ in range(start):
+        next(replay)
+    simulation = time.perf_counter() - started
+
+    started = time.perf_counter()
+    frames = []
+    for tick in range(start, end):
+        next(replay)
+        render_game(screen, replay.loop)
+        pygame.image.save(screen, os.path.join(output, frame_name(tick)))
+        frames.append((tick, clock_rate(replay.loop)))
+    rendering = time.perf_counter() - started
+    memory = private_memory()
+    pygame.quit()
+    return frames, simulation, rendering, memory
+
+
+def private_memory():
+    """
+    Bytes of memory only this process uses, None where /proc is missing.
+    """
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    size = 0
+    for line in lines:
+        if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+            size += int(line.split()[1]) * 1024
+    return size
+
+
+def clock_rate(loop):
+    # Framerate the game loop paces the tick at.
+    from drunkparanoia.config import LOOP_STATUSES
+    if loop.status == LOOP_STATUSES.SCORE:
+        return 10
+    return loop.tick_time
+
+
+def frame_name(tick):
+    return f'frame_{tick:06d}.png'
+
+
+def write_timeline(output, frames):
+    filepath = os.path.join(output, 'timeline.txt')
+    with open(filepath, 'w') as f:
+        for tick, rate in frames:
+            f.write(f"file '{frame_name(tick)}'\nduration {1 / rate:.6f}\n")
+        # The concat demuxer ignores the duration of the last entry.
+        if frames:
+            f.write(f"file '{frame_name(frames[-1][0])}'\n")
+    return filepath
+
+
+def encode_video(timeline, video):
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        print('ffmpeg not found, only the image sequence is written.')
+        return False
+    command = [
+        ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+        '-i', timeline, '-vf', 'fps=60', '-pix_fmt', 'yuv420p',
+        os.path.abspath(video)]
+    subprocess.run(command, check=True)
+    return True
+
+
+def export_assets(scene_path):
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    import pygame
+    from drunkparanoia.shared import export_assets
+    # The assets are converted to the display format.
+    pygame.init()
+    pygame.display.set_mode((640, 360))
+    memory = export_assets(scene_path)
+    print(f'shared assets: {memory.size / 1024 ** 2:.1f} MB')
+    return memory
+
+
+def main():
+    from drunkparanoia.replay import load_replay
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('replay')
+    parser.add_argument('--output', default='replay_frames')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk', type=int, default=600)
+    parser.add_argument('--video')
+    parser.add_argument(
+        '--private-assets', action='store_true',
+        help='let every worker decode its own copy of the assets')
+    options = parser.parse_args()
+
+    data = load_replay(options.replay)
+    ticks = data['ticks']
+    os.makedirs(options.output, exist_ok=True)
+
+    started = time.perf_counter()
+    memory = None
+    if not options.private_assets:
+        memory = export_assets(data['scene'])
+    ranges = [
+        (options.replay, start, min(start + options.chunk, ticks),
+         options.output, memory and memory.name)
+        for start in range(0, ticks, options.chunk)]
+
+    # Spawned workers do not inherit an initialized pygame.
+    context = multiprocessing.get_context('spawn')
+    try:
+        with context.Pool(options.workers) as pool:
+            results = pool.starmap(render_range, ranges)
+    finally:
+        if memory:
+            memory.close()
+            memory.unlink()
+    elapsed = time.perf_counter() - started
+
+    frames = [frame for result in results for frame in result[0]]
+    simulation = sum(result[1] for result in results)
+    rendering = sum(result[2] for result in results)
+    timeline = write_timeline(options.output, frames)
+    print(
+        f'{len(frames)} frames, {len(ranges)} ranges, '
+        f'{options.workers} workers: {elapsed:.2f} s, '
+        f'{len(frames) / elapsed:.1f} frames/s')
+    print(
+        f'per core: {len(frames) / rendering:.1f} frames/s rendered, '
+        f'{simulation:.2f} s spent to reach the ranges')
+    sizes = [result[3] for result in results if result[3] is not None]
+    if sizes:
+        print(
+            f'private memory per worker: '
+            f'{sum(sizes) / len(sizes) / 1024 ** 2:.1f} MB')
+    if options.video:
+        encode_video(timeline, options.video)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())